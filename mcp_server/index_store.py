@@ -1,132 +1,443 @@
 import os
+import codecs
+import sqlite3
+import threading
+import functools
+import logging
+import mmap
+import multiprocessing
 import gitignore_parser
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple, Union
 
-# Store indexed directories and their file contents
-# Key: Absolute path of the indexed directory
-# Value: Dict[str, Optional[str]] where key is relative file path, value is file content or None if unreadable/ignored
-_indexed_data: Dict[str, Dict[str, Optional[str]]] = {}
+logger = logging.getLogger(__name__)
+
+# Indexed directories and per-file metadata live in SQLite; file content is read
+# from disk on demand in get_file_content, so indexing cost is one stat per file.
+INDEX_DB_PATH = os.getenv("MCP_INDEX_DB", os.path.join(os.path.dirname(__file__), "data", "index.db"))
 
 MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024 # Skip files larger than 5MB
+# Number of file contents kept in memory by get_file_content
+CONTENT_CACHE_SIZE = 256
+# Number of per-path ignore decisions remembered by each cached .gitignore matcher
+GITIGNORE_DECISION_CACHE_SIZE = 65536
+# Bumped whenever the table layout changes; older databases are rebuilt
+SCHEMA_VERSION = 2
+# Worker processes used to scan top-level subdirectories in parallel; 1 scans in-process.
+# Only worth raising for very large trees, since each worker must be spawned.
+SCAN_PROCESSES = int(os.getenv("MCP_SCAN_PROCESSES", "1"))
+
+# File status codes stored alongside each entry
+STATUS_INDEXED = 0
+STATUS_IGNORED = 1
+STATUS_SKIPPED_SIZE = 2
+STATUS_SKIPPED_ENCODING = 3
+STATUS_SKIPPED_ERROR = 4
+STATUS_SKIPPED_BINARY = 5
+
+# Directory names that are never descended into: VCS metadata, dependency trees and
+# tool caches. Kept narrower than the mvp indexer's skip_directories, since names like
+# build/ or packages/ can hold files a client legitimately wants to read.
+SKIP_DIRECTORIES = frozenset({
+    '.git', '.hg', '.svn',
+    'node_modules', 'bower_components', 'jspm_packages',
+    '__pycache__', '.mypy_cache', '.pytest_cache', '.ruff_cache', '.tox', '.nox',
+    'venv', '.venv',
+    '.next', '.nuxt',
+})
+
+# Only the start of a file is checked for NUL bytes when sniffing binaries
+BINARY_SNIFF_BYTES = 8192
+# Files larger than this are decoded straight from a read-only memory map
+MMAP_THRESHOLD_BYTES = 64 * 1024
+# Files larger than this are streamed to clients in STREAM_CHUNK_BYTES pieces
+# instead of being decoded into one string and serialized in a single payload
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+# Extensions that are always binary; these are skipped without opening the file
+BINARY_EXTENSIONS = frozenset({
+    '.so', '.dylib', '.dll', '.exe', '.bin', '.dat', '.o', '.a', '.class',
+    '.pyc', '.pyo', '.pyd',
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.webp',
+    '.mp3', '.mp4', '.wav', '.avi', '.mov', '.webm',
+    '.zip', '.tar', '.gz', '.bz2', '.xz', '.rar', '.7z',
+    '.whl', '.egg', '.jar',
+    '.db', '.sqlite', '.sqlite3',
+    '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+})
+
+_db_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+
+def _get_db() -> sqlite3.Connection:
+    """Opens the index database on first use and creates its tables."""
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(INDEX_DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(INDEX_DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Server workers may open the database at the same time, so the version check
+        # and any rebuild run in one write transaction: the first worker migrates, and
+        # the others then find the current version instead of dropping its tables
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS files")
+                conn.execute("DROP TABLE IF EXISTS directories")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("CREATE TABLE IF NOT EXISTS directories (dir TEXT PRIMARY KEY)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "dir TEXT NOT NULL, rel TEXT NOT NULL, status INTEGER NOT NULL, "
+                "size INTEGER, mtime_ns INTEGER, PRIMARY KEY (dir, rel))"
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        _db = conn
+    return _db
+
+# Parsed .gitignore matchers, keyed by absolute .gitignore path -> (mtime, matcher).
+# Each matcher memoizes its per-path decisions, so re-scanning an unchanged tree
+# skips the rule chain entirely; gitignored directories are pruned in _scan, so
+# files below them never reach the matcher at all.
+_gitignore_cache: Dict[str, Tuple[float, Callable[[str], bool]]] = {}
+
+def _load_gitignore(gitignore_path: str) -> Optional[Callable[[str], bool]]:
+    """Returns a matcher for a .gitignore file, reusing the cached one while the file is unchanged."""
+    try:
+        mtime = os.stat(gitignore_path).st_mtime
+    except OSError:
+        return None
+
+    cached = _gitignore_cache.get(gitignore_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        # gitignore_parser matchers resolve their input against the .gitignore's
+        # directory, so they are always called with absolute paths
+        matcher = functools.lru_cache(maxsize=GITIGNORE_DECISION_CACHE_SIZE)(
+            gitignore_parser.parse_gitignore(gitignore_path)
+        )
+    except Exception as e:
+        logger.warning("Could not read or parse .gitignore at %s: %s", gitignore_path, e)
+        return None
+    _gitignore_cache[gitignore_path] = (mtime, matcher)
+    logger.info("Loaded .gitignore rules from %s", gitignore_path)
+    return matcher
+
+# (relative path, status, size, mtime_ns) recorded for every scanned file
+FileRow = Tuple[str, int, Optional[int], Optional[int]]
+
+def _scan(root: str, matches_gitignore: Optional[Callable[[str], bool]] = None, rel_root: str = "") -> Iterator[Tuple[os.DirEntry, str]]:
+    """Yields (DirEntry, relative path) for files under root, pruning skipped and gitignored directories before entering them."""
+    stack = [(root, rel_root)]
+    while stack:
+        current, rel_prefix = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            # Mirror os.walk, which silently skips unreadable directories
+            continue
+
+        for entry in entries:
+            rel_path = rel_prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in SKIP_DIRECTORIES or (matches_gitignore and matches_gitignore(entry.path)):
+                        continue
+                    stack.append((entry.path, rel_path + os.sep))
+                elif entry.is_file():
+                    yield entry, rel_path
+            except OSError:
+                continue
+
+def _classify(entry: os.DirEntry, relative_file_path: str, matches_gitignore: Optional[Callable[[str], bool]]) -> FileRow:
+    """Builds the index row for one file from its ignore status and a single stat."""
+    # Check if ignored by .gitignore
+    if matches_gitignore and matches_gitignore(entry.path):
+        #logger.debug("Ignoring file (matches .gitignore): %s", relative_file_path)
+        return relative_file_path, STATUS_IGNORED, None, None
+
+    if os.path.splitext(entry.name)[1].lower() in BINARY_EXTENSIONS:
+        return relative_file_path, STATUS_SKIPPED_BINARY, None, None
+
+    # Only metadata is recorded here; content is read on first request
+    try:
+        stat = entry.stat()
+    except OSError as e:
+        logger.debug("Skipping file (cannot get size: %s): %s", e, relative_file_path)
+        return relative_file_path, STATUS_SKIPPED_ERROR, None, None
+
+    if stat.st_size > MAX_FILE_SIZE_BYTES:
+        logger.debug("Skipping file (too large: %d bytes): %s", stat.st_size, relative_file_path)
+        return relative_file_path, STATUS_SKIPPED_SIZE, stat.st_size, stat.st_mtime_ns
+
+    return relative_file_path, STATUS_INDEXED, stat.st_size, stat.st_mtime_ns
+
+def _scan_subtree(job: Tuple[str, str, str]) -> List[FileRow]:
+    """Worker entry point: classifies every file below one top-level subdirectory."""
+    abs_path, subroot, rel_root = job
+    # Matchers are closures and cannot be pickled, so each worker loads its own
+    matches_gitignore = _load_gitignore(os.path.join(abs_path, ".gitignore"))
+    return [_classify(entry, rel, matches_gitignore) for entry, rel in _scan(subroot, matches_gitignore, rel_root)]
+
+def _iter_file_rows(abs_path: str, matches_gitignore: Optional[Callable[[str], bool]]) -> Iterator[FileRow]:
+    """Yields a row per file under abs_path, sharding top-level subdirectories across processes if enabled."""
+    if SCAN_PROCESSES <= 1:
+        for entry, rel in _scan(abs_path, matches_gitignore):
+            yield _classify(entry, rel, matches_gitignore)
+        return
+
+    try:
+        with os.scandir(abs_path) as it:
+            entries = list(it)
+    except OSError:
+        return
+
+    jobs: List[Tuple[str, str, str]] = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not (entry.name in SKIP_DIRECTORIES or (matches_gitignore and matches_gitignore(entry.path))):
+                    jobs.append((abs_path, entry.path, entry.name + os.sep))
+            elif entry.is_file():
+                yield _classify(entry, entry.name, matches_gitignore)
+        except OSError:
+            continue
+
+    # spawn rather than fork: the server process may hold locks in other threads
+    with multiprocessing.get_context("spawn").Pool(min(SCAN_PROCESSES, max(len(jobs), 1))) as pool:
+        for part in pool.imap_unordered(_scan_subtree, jobs):
+            yield from part
+
+def _read_text(full_file_path: str, max_size: int = MAX_FILE_SIZE_BYTES) -> Tuple[Optional[str], int]:
+    """Reads a file as UTF-8, returning (content or None, status).
+
+    The first chunk is checked for NUL bytes (memchr) so binaries are rejected before the
+    rest is read. Files exceeding MMAP_THRESHOLD_BYTES (by fstat on the open file, so a file
+    truncated since it was listed is never mapped) are decoded from a memory map, skipping
+    the copy into an intermediate bytes object; otherwise reading up to max_size + 1 bytes
+    tells oversized files apart.
+    """
+    with open(full_file_path, 'rb') as f:
+        head = f.read(BINARY_SNIFF_BYTES)
+        if b'\x00' in head:
+            return None, STATUS_SKIPPED_BINARY
+
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) > max_size:
+                    return None, STATUS_SKIPPED_SIZE
+                with memoryview(mm) as view:
+                    try:
+                        return str(view, 'utf-8'), STATUS_INDEXED
+                    except UnicodeDecodeError:
+                        return None, STATUS_SKIPPED_ENCODING
+
+        data = head + f.read(max_size + 1 - len(head))
+    if len(data) > max_size:
+        return None, STATUS_SKIPPED_SIZE
+    try:
+        return data.decode('utf-8'), STATUS_INDEXED
+    except UnicodeDecodeError:
+        return None, STATUS_SKIPPED_ENCODING
+
+@functools.lru_cache(maxsize=CONTENT_CACHE_SIZE)
+def _read_text_cached(full_file_path: str, mtime_ns: int, size: int) -> Tuple[Optional[str], int]:
+    """Cached _read_text; mtime and size are part of the key so files edited on disk are re-read."""
+    return _read_text(full_file_path)
+
+def _is_indexed(abs_path: str) -> bool:
+    """Checks whether a directory has been registered in the index."""
+    with _db_lock:
+        row = _get_db().execute("SELECT 1 FROM directories WHERE dir = ?", (abs_path,)).fetchone()
+    return row is not None
 
 def add_indexed_directory(path: str):
-    """Scans a directory, respecting .gitignore, and stores the content of text files found within it."""
+    """Scans a directory, respecting .gitignore, and records the files found within it for on-demand reads."""
     abs_path = os.path.abspath(path)
     if not os.path.isdir(abs_path):
-        print(f"Error: Path is not a valid directory: {path}")
+        logger.error("Path is not a valid directory: %s", path)
         return
 
-    gitignore_path = os.path.join(abs_path, ".gitignore")
-    matches_gitignore = None
-    if os.path.exists(gitignore_path):
-        try:
-            with open(gitignore_path, 'r') as f:
-                matches_gitignore = gitignore_parser.parse(f)
-            print(f"Loaded .gitignore rules from {gitignore_path}")
-        except Exception as e:
-            print(f"Warning: Could not read or parse .gitignore at {gitignore_path}: {e}")
-
-    if abs_path in _indexed_data:
-        print(f"Directory already indexed: {abs_path}. Re-scanning...")
+    matches_gitignore = _load_gitignore(os.path.join(abs_path, ".gitignore"))
+
+    if _is_indexed(abs_path):
+        logger.info("Directory already indexed: %s. Re-scanning...", abs_path)
     else:
-        print(f"Adding directory to index: {abs_path}")
+        logger.info("Adding directory to index: %s", abs_path)
 
-    file_contents: Dict[str, Optional[str]] = {}
     files_scanned = 0
     files_indexed = 0
     files_ignored = 0
     files_skipped_size = 0
-    files_skipped_encoding = 0
-
-    for root, dirs, files in os.walk(abs_path, topdown=True):
-        # Filter directories based on gitignore (basic implementation)
-        # A more robust implementation might modify dirs list in place
-        # based on patterns like 'node_modules/'
-        dirs[:] = [d for d in dirs if not (matches_gitignore and matches_gitignore(os.path.join(root, d)))]
-
-        for file in files:
-            files_scanned += 1
-            full_file_path = os.path.join(root, file)
-            relative_file_path = os.path.relpath(full_file_path, abs_path)
-
-            # Check if ignored by .gitignore
-            if matches_gitignore and matches_gitignore(full_file_path):
-                #print(f"Ignoring file (matches .gitignore): {relative_file_path}")
-                file_contents[relative_file_path] = None # Mark as ignored
-                files_ignored += 1
-                continue
+    rows: List[Tuple[str, str, int, Optional[int], Optional[int]]] = []
 
-            # Check file size
-            try:
-                file_size = os.path.getsize(full_file_path)
-                if file_size > MAX_FILE_SIZE_BYTES:
-                    print(f"Skipping file (too large: {file_size} bytes): {relative_file_path}")
-                    file_contents[relative_file_path] = None # Mark as skipped (size)
-                    files_skipped_size += 1
-                    continue
-            except OSError as e:
-                print(f"Skipping file (cannot get size: {e}): {relative_file_path}")
-                file_contents[relative_file_path] = None # Mark as skipped (error)
-                continue
+    # The scan runs with no lock held, so readers aren't held up behind it
+    for relative_file_path, status, size, mtime_ns in _iter_file_rows(abs_path, matches_gitignore):
+        files_scanned += 1
+        rows.append((abs_path, relative_file_path, status, size, mtime_ns))
+        if status == STATUS_INDEXED:
+            files_indexed += 1
+        elif status == STATUS_IGNORED:
+            files_ignored += 1
+        elif status == STATUS_SKIPPED_SIZE:
+            files_skipped_size += 1
 
-            # Try reading file content
-            try:
-                with open(full_file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                file_contents[relative_file_path] = content
-                files_indexed += 1
-            except UnicodeDecodeError:
-                #print(f"Skipping file (not UTF-8 text): {relative_file_path}")
-                file_contents[relative_file_path] = None # Mark as skipped (encoding)
-                files_skipped_encoding += 1
-            except OSError as e:
-                print(f"Skipping file (cannot read: {e}): {relative_file_path}")
-                file_contents[relative_file_path] = None # Mark as skipped (error)
-            except Exception as e:
-                print(f"Skipping file (unexpected error: {e}): {relative_file_path}")
-                file_contents[relative_file_path] = None # Mark as skipped (error)
-
-
-    _indexed_data[abs_path] = file_contents
-    print(f"Finished indexing {abs_path}:")
-    print(f"  Scanned: {files_scanned}")
-    print(f"  Indexed: {files_indexed}")
-    print(f"  Ignored (.gitignore): {files_ignored}")
-    print(f"  Skipped (Size > {MAX_FILE_SIZE_BYTES / (1024*1024)}MB): {files_skipped_size}")
-    print(f"  Skipped (Encoding/Read Error): {files_skipped_encoding}")
-    print(f"  Total entries stored (incl. skipped): {len(file_contents)}")
+    with _db_lock:
+        db = _get_db()
+        # Replace the previous scan atomically: readers see either the old or the new index
+        with db:
+            db.execute("INSERT OR IGNORE INTO directories (dir) VALUES (?)", (abs_path,))
+            db.execute("DELETE FROM files WHERE dir = ?", (abs_path,))
+            db.executemany("INSERT OR REPLACE INTO files (dir, rel, status, size, mtime_ns) VALUES (?, ?, ?, ?, ?)", rows)
+
+    logger.info(
+        "Finished indexing %s: scanned=%d indexed=%d (content loaded on demand) "
+        "ignored=%d skipped_size(>%.1fMB)=%d",
+        abs_path, files_scanned, files_indexed, files_ignored,
+        MAX_FILE_SIZE_BYTES / (1024*1024), files_skipped_size
+    )
 
 def get_indexed_directories() -> List[str]:
     """Returns the list of currently indexed directory paths."""
-    return list(_indexed_data.keys())
+    with _db_lock:
+        return [row[0] for row in _get_db().execute("SELECT dir FROM directories ORDER BY rowid")]
 
 def get_files_in_directory(path: str) -> List[str]:
     """Returns the list of *indexed* (non-skipped/ignored) relative file paths for a directory."""
     abs_path = os.path.abspath(path)
-    if abs_path not in _indexed_data:
-        print(f"Error: Directory not indexed: {abs_path}")
+    if not _is_indexed(abs_path):
+        logger.error("Directory not indexed: %s", abs_path)
         return []
     # Return only files that have content (were not skipped/ignored)
-    return [f for f, content in _indexed_data.get(abs_path, {}).items() if content is not None]
+    with _db_lock:
+        cursor = _get_db().execute(
+            "SELECT rel FROM files WHERE dir = ? AND status = ? ORDER BY rel",
+            (abs_path, STATUS_INDEXED)
+        )
+        return [row[0] for row in cursor]
 
-def get_file_content(directory_path: str, file_path: str) -> Optional[str]:
-    """Returns the stored content of a specific file within an indexed directory."""
-    abs_dir_path = os.path.abspath(directory_path)
-    if abs_dir_path not in _indexed_data:
-        print(f"Error: Directory not indexed: {abs_dir_path}")
+def _lookup_file(abs_dir_path: str, normalized_file_path: str) -> Optional[str]:
+    """Returns the absolute path of an indexed file, or None if it is unknown, ignored or skipped."""
+    if not _is_indexed(abs_dir_path):
+        logger.error("Directory not indexed: %s", abs_dir_path)
+        return None # Or raise error
+
+    with _db_lock:
+        row = _get_db().execute(
+            "SELECT status FROM files WHERE dir = ? AND rel = ?",
+            (abs_dir_path, normalized_file_path)
+        ).fetchone()
+
+    if row is None:
+        logger.error("File not found in index: %s", normalized_file_path)
         return None # Or raise error
+    if row[0] != STATUS_INDEXED:
+        logger.info("File was skipped or ignored during indexing: %s", normalized_file_path)
+        return None # Indicate skipped/ignored
+
+    return os.path.join(abs_dir_path, normalized_file_path)
+
+def _mark_skipped(abs_dir_path: str, normalized_file_path: str, status: int):
+    """Records a binary/encoding problem that was only discovered when the file was first read."""
+    with _db_lock:
+        db = _get_db()
+        with db:
+            db.execute(
+                "UPDATE files SET status = ? WHERE dir = ? AND rel = ?",
+                (status, abs_dir_path, normalized_file_path)
+            )
+    logger.info("File was skipped (binary, not UTF-8 or too large): %s", normalized_file_path)
+
+def _read_content(abs_dir_path: str, normalized_file_path: str, full_file_path: str, stat: os.stat_result) -> Optional[str]:
+    """Reads an indexed file through the content cache, marking it skipped if it turns out not to be text."""
+    try:
+        content, status = _read_text_cached(full_file_path, stat.st_mtime_ns, stat.st_size)
+    except OSError as e:
+        logger.error("Cannot read file %s: %s", normalized_file_path, e)
+        return None
 
-    directory_data = _indexed_data[abs_dir_path]
+    if status != STATUS_INDEXED:
+        _mark_skipped(abs_dir_path, normalized_file_path, status)
+        return None
+    return content
 
+def get_file_content(directory_path: str, file_path: str) -> Optional[str]:
+    """Returns the content of a specific file within an indexed directory, reading it from disk on demand."""
+    abs_dir_path = os.path.abspath(directory_path)
     # Normalize file_path separator just in case
     normalized_file_path = os.path.normpath(file_path)
 
-    content = directory_data.get(normalized_file_path)
-    if content is None and normalized_file_path in directory_data:
-        print(f"Info: File was skipped or ignored during indexing: {normalized_file_path}")
-        return None # Indicate skipped/ignored
-    elif normalized_file_path not in directory_data:
-        print(f"Error: File not found in index: {normalized_file_path}")
-        return None # Or raise error
+    full_file_path = _lookup_file(abs_dir_path, normalized_file_path)
+    if full_file_path is None:
+        return None
+    try:
+        stat = os.stat(full_file_path)
+    except OSError as e:
+        logger.error("Cannot read file %s: %s", normalized_file_path, e)
+        return None
+    return _read_content(abs_dir_path, normalized_file_path, full_file_path, stat)
+
+def _check_text(full_file_path: str, max_size: int = MAX_FILE_SIZE_BYTES) -> int:
+    """Validates a file as UTF-8 text chunk by chunk, without holding its decoded content; returns a status."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    total = 0
+    with open(full_file_path, 'rb') as f:
+        chunk = f.read(BINARY_SNIFF_BYTES)
+        if b'\x00' in chunk:
+            return STATUS_SKIPPED_BINARY
+        while chunk:
+            total += len(chunk)
+            if total > max_size:
+                return STATUS_SKIPPED_SIZE
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                return STATUS_SKIPPED_ENCODING
+            chunk = f.read(STREAM_CHUNK_BYTES)
+    try:
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return STATUS_SKIPPED_ENCODING
+    return STATUS_INDEXED
+
+def _iter_text_chunks(full_file_path: str) -> Iterator[str]:
+    """Yields a file's decoded content in pieces that never split a character."""
+    # The file was validated by _check_text; replace only guards against edits made since
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with open(full_file_path, 'rb') as f:
+        while chunk := f.read(STREAM_CHUNK_BYTES):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def stream_file_content(directory_path: str, file_path: str) -> Union[str, Iterator[str], None]:
+    """Like get_file_content, but returns files larger than STREAM_THRESHOLD_BYTES as an iterator of text chunks."""
+    abs_dir_path = os.path.abspath(directory_path)
+    normalized_file_path = os.path.normpath(file_path)
+
+    full_file_path = _lookup_file(abs_dir_path, normalized_file_path)
+    if full_file_path is None:
+        return None
+    try:
+        stat = os.stat(full_file_path)
+        if stat.st_size <= STREAM_THRESHOLD_BYTES:
+            return _read_content(abs_dir_path, normalized_file_path, full_file_path, stat)
+        status = _check_text(full_file_path)
+    except OSError as e:
+        logger.error("Cannot read file %s: %s", normalized_file_path, e)
+        return None
 
-    return content 
\ No newline at end of file
+    if status != STATUS_INDEXED:
+        _mark_skipped(abs_dir_path, normalized_file_path, status)
+        return None
+    return _iter_text_chunks(full_file_path)
@@ -1,14 +1,26 @@
+import logging
+import logging.handlers
+import queue
+import orjson
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
 from .mcp_handler import handle_mcp_request
 
+# Log records are queued and written by a listener thread, so request handlers
+# and scan workers never block on stream I/O
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+
 app = FastAPI(
     title="MCP Codebase Indexer Server",
     description="An MCP server to index and query local codebases.",
-    version="0.1.0"
+    version="0.1.0",
+    # orjson serializes large payloads (e.g. whole file contents) much faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -26,6 +38,24 @@ app.add_middleware(
     allow_headers=["*"] # Allow all headers
 )
 
+@app.on_event("startup")
+async def startup():
+    """Start the background log writer."""
+    _log_listener.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush and stop the background log writer."""
+    _log_listener.stop()
+
+def _stream_json(request_id: Any, chunks: Iterator[str]) -> Iterator[bytes]:
+    """Writes a get_file_content response envelope around content that is escaped chunk by chunk."""
+    yield b'{"jsonrpc":"2.0","id":' + orjson.dumps(request_id) + b',"result":{"content":"'
+    for chunk in chunks:
+        # Chunks never split a character, so their escaped forms concatenate to a valid JSON string
+        yield orjson.dumps(chunk)[1:-1]
+    yield b'"}}'
+
 @app.post("/")
 async def mcp_endpoint(request: Request):
     """Main endpoint for handling all MCP requests."""
@@ -33,15 +63,18 @@ async def mcp_endpoint(request: Request):
         raise HTTPException(status_code=415, detail="Unsupported Media Type. Expecting application/json")
 
     try:
-        body = await request.json()
-    except Exception as e:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
         raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
 
     if not isinstance(body, dict) or body.get("jsonrpc") != "2.0":
          raise HTTPException(status_code=400, detail="Invalid JSON-RPC request format.")
 
     response_data = handle_mcp_request(body)
-    return JSONResponse(content=response_data)
+    content = (response_data.get("result") or {}).get("content")
+    if isinstance(content, Iterator):
+        return StreamingResponse(_stream_json(response_data["id"], content), media_type="application/json")
+    return ORJSONResponse(content=response_data)
 
 @app.get("/health")
 async def health_check():
@@ -1,9 +1,14 @@
-from typing import List, Set, Dict
+from typing import List, Set, Dict, FrozenSet, Optional, Pattern
 import os
+import re
 import json
+import fnmatch
+import logging
 from pathlib import Path
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
 
 class Settings(BaseSettings):
     # Neo4j settings
@@ -107,10 +112,17 @@ class Settings(BaseSettings):
     # Data directory for storing settings, etc.
     data_dir: str = Field("./data", env="DATA_DIR")
     
+    # Size bound of the on-disk cache of parsed ASTs (least recently used entries are evicted)
+    ast_cache_size_mb: int = Field(2048, env='AST_CACHE_SIZE_MB')
+    
     # Security settings
     jwt_secret_key: str = Field(..., env='JWT_SECRET_KEY')
     access_token_expire_minutes: int = Field(30, env='ACCESS_TOKEN_EXPIRE_MINUTES')
     
+    # Compiled forms of skip_directories / ignore_patterns, built once at init
+    _skip_directory_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+    _ignore_regex: Optional[Pattern] = PrivateAttr(default=None)
+    
     class Config:
         env_file = '.env'
         case_sensitive = False
@@ -119,6 +131,23 @@ class Settings(BaseSettings):
         super().__init__(**kwargs)
         self._create_data_dir()
         self._load_repository_settings()
+        self._compile_patterns()
+    
+    def _compile_patterns(self):
+        """Precompile the skip set and a single regex covering all ignore patterns"""
+        self._skip_directory_set = frozenset(self.skip_directories)
+        if self.ignore_patterns:
+            self._ignore_regex = re.compile('|'.join(fnmatch.translate(p) for p in self.ignore_patterns))
+        else:
+            self._ignore_regex = None
+    
+    def is_skipped_directory(self, dirname: str) -> bool:
+        """Check a directory name against skip_directories"""
+        return dirname in self._skip_directory_set
+    
+    def is_ignored_filename(self, filename: str) -> bool:
+        """Check a file name against ignore_patterns"""
+        return self._ignore_regex is not None and self._ignore_regex.match(filename) is not None
     
     def _create_data_dir(self):
         """Create data directory if it doesn't exist"""
@@ -137,7 +166,7 @@ class Settings(BaseSettings):
                 with open(settings_file, 'r') as f:
                     self.repository_settings = json.load(f)
             except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading repository settings: {e}")
+                logger.error("Error loading repository settings: %s", e)
     
     def save_repository_settings(self):
         """Save repository settings to file"""
@@ -147,7 +176,7 @@ class Settings(BaseSettings):
             with open(settings_file, 'w') as f:
                 json.dump(self.repository_settings, f, indent=2)
         except IOError as e:
-            print(f"Error saving repository settings: {e}")
+            logger.error("Error saving repository settings: %s", e)
 
 # Create global settings instance
 settings = Settings() 
\ No newline at end of file
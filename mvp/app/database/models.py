@@ -1,6 +1,6 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
-from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
 
 class NodeType(str, Enum):
     MODULE = "module"
@@ -17,33 +17,37 @@ class RelationType(str, Enum):
     IMPORTS = "IMPORTS"
     USES = "USES"
 
-class Position(BaseModel):
+# The models below are built once per AST node while indexing, so they are
+# slotted dataclasses rather than validated pydantic models.
+
+@dataclass(slots=True)
+class Position:
     start_line: int
     end_line: int
     start_col: Optional[int] = None
     end_col: Optional[int] = None
 
-class CodeNode(BaseModel):
-    id: Optional[str] = None  # Neo4j ID once created
+@dataclass(slots=True)
+class CodeNode:
     name: str
     type: NodeType
     file_path: str
     position: Position
-    properties: Dict[str, any] = Field(default_factory=dict)
-    
-class CodeRelation(BaseModel):
+    properties: Dict[str, Any] = field(default_factory=dict)
+    id: Optional[str] = None  # Neo4j ID once created
+
+@dataclass(slots=True)
+class CodeRelation:
     source_id: str
     target_id: str
     type: RelationType
-    properties: Dict[str, any] = Field(default_factory=dict)
+    properties: Dict[str, Any] = field(default_factory=dict)
 
-class ASTNode(BaseModel):
+@dataclass(slots=True)
+class ASTNode:
     """Represents a node in the Abstract Syntax Tree"""
     type: NodeType
     name: str
     position: Position
-    children: List['ASTNode'] = Field(default_factory=list)
-    properties: Dict[str, any] = Field(default_factory=dict)
-
-# This is needed for the recursive type hint in ASTNode
-ASTNode.model_rebuild() 
\ No newline at end of file
+    children: List['ASTNode'] = field(default_factory=list)
+    properties: Dict[str, Any] = field(default_factory=dict)
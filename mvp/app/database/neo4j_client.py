@@ -1,20 +1,42 @@
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from neo4j import GraphDatabase, Driver
 from neo4j.exceptions import Neo4jError
 
 from ..config import settings
-from .models import CodeNode, CodeRelation, NodeType, RelationType
+from .models import CodeNode, CodeRelation, NodeType, Position, RelationType
+
+# Connection pool settings for the shared driver
+MAX_CONNECTION_POOL_SIZE = 50
+CONNECTION_ACQUISITION_TIMEOUT = 60
+
+# A node to create: its label (a NodeType value) and the property map stored on it
+NodeRow = Tuple[str, Dict[str, Any]]
+
+def node_properties(name: str, file_path: str, position: Position, properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a node's fields into the property map stored on the graph node"""
+    return {
+        "name": name,
+        "file_path": file_path,
+        "start_line": position.start_line,
+        "end_line": position.end_line,
+        "start_col": position.start_col,
+        "end_col": position.end_col,
+        **properties
+    }
 
 class Neo4jClient:
     def __init__(self):
         self._driver: Optional[Driver] = None
+        self._indexes_ensured = False
         
     def connect(self) -> None:
         """Establish connection to Neo4j database"""
         if not self._driver:
             self._driver = GraphDatabase.driver(
                 settings.neo4j_uri,
-                auth=(settings.neo4j_user, settings.neo4j_password)
+                auth=(settings.neo4j_user, settings.neo4j_password),
+                max_connection_pool_size=MAX_CONNECTION_POOL_SIZE,
+                connection_acquisition_timeout=CONNECTION_ACQUISITION_TIMEOUT
             )
             
     def close(self) -> None:
@@ -29,6 +51,26 @@ class Neo4jClient:
             self.connect()
         return self._driver.session()
     
+    def ensure_indexes(self) -> None:
+        """Create the indexes used by indexing lookups, once per client"""
+        if self._indexes_ensured:
+            return
+        # Indexed nodes are labelled by node type; the repository root and
+        # delete_file_nodes use the generic Node label
+        labels = ["Node"] + [node_type.value for node_type in NodeType]
+        with self._get_session() as session:
+            for label in labels:
+                session.run(
+                    "CREATE INDEX {name} IF NOT EXISTS FOR (n:`{label}`) ON (n.file_path)".format(
+                        name=f"{label.lower()}_file_path", label=label
+                    )
+                ).consume()
+            # get_or_create_root_node MERGEs on both properties
+            session.run(
+                "CREATE INDEX node_root IF NOT EXISTS FOR (n:Node) ON (n.is_root, n.file_path)"
+            ).consume()
+        self._indexes_ensured = True
+    
     def create_node(self, node: CodeNode) -> str:
         """Create a new node in the graph database"""
         query = """
@@ -53,6 +95,101 @@ class Neo4jClient:
             record = result.single()
             return str(record["node_id"])
             
+    @staticmethod
+    def _node_row(node: CodeNode) -> NodeRow:
+        """Flatten a CodeNode into its label and property map"""
+        return node.type.value, node_properties(node.name, node.file_path, node.position, node.properties)
+
+    @classmethod
+    def _tx_create_nodes(cls, tx, nodes: List[CodeNode], batch_size: int) -> List[str]:
+        return cls._tx_create_node_rows(tx, [cls._node_row(node) for node in nodes], batch_size)
+
+    @staticmethod
+    def _tx_create_node_rows(tx, nodes: List[NodeRow], batch_size: int) -> List[str]:
+        ids: List[Optional[str]] = [None] * len(nodes)
+        
+        # Labels cannot be parameterized, so group nodes by label
+        groups: Dict[str, List[int]] = {}
+        for index, (label, _) in enumerate(nodes):
+            groups.setdefault(label, []).append(index)
+        
+        for label, indices in groups.items():
+            # Every indexed node also gets the generic Node label that delete_file_nodes matches
+            query = """
+            UNWIND $rows AS r
+            CREATE (n:Node:`{label}`)
+            SET n = r.props, n.created = timestamp()
+            RETURN r.idx AS idx, id(n) AS node_id
+            """.format(label=label)
+            
+            for start in range(0, len(indices), batch_size):
+                rows = [
+                    {"idx": index, "props": nodes[index][1]}
+                    for index in indices[start:start + batch_size]
+                ]
+                for record in tx.run(query, {"rows": rows}):
+                    ids[record["idx"]] = str(record["node_id"])
+        
+        return ids
+
+    @classmethod
+    def _tx_create_relationships(cls, tx, relations: List[CodeRelation], batch_size: int) -> None:
+        # Relationship types cannot be parameterized, so group by type
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for relation in relations:
+            groups.setdefault(relation.type.value, []).append({
+                "source_id": int(relation.source_id),
+                "target_id": int(relation.target_id),
+                "props": relation.properties
+            })
+        
+        for rel_type, rows in groups.items():
+            cls._tx_create_relationship_rows(tx, rel_type, rows, batch_size)
+
+    @staticmethod
+    def _tx_create_relationship_rows(tx, rel_type: str, rows: List[Dict[str, Any]], batch_size: int) -> None:
+        query = """
+        UNWIND $rows AS r
+        MATCH (source)
+        WHERE id(source) = r.source_id
+        MATCH (target)
+        WHERE id(target) = r.target_id
+        CREATE (source)-[rel:`{rel_type}`]->(target)
+        SET rel = r.props, rel.created = timestamp()
+        """.format(rel_type=rel_type)
+        
+        for start in range(0, len(rows), batch_size):
+            tx.run(query, {"rows": rows[start:start + batch_size]}).consume()
+
+    @classmethod
+    def _tx_create_trees(cls, tx, nodes: List[NodeRow], parents: List[Union[int, str]], batch_size: int) -> List[str]:
+        node_ids = cls._tx_create_node_rows(tx, nodes, batch_size)
+        rows = [
+            {
+                "source_id": int(node_ids[parent] if isinstance(parent, int) else parent),
+                "target_id": int(node_ids[index]),
+                "props": {}
+            }
+            for index, parent in enumerate(parents)
+        ]
+        cls._tx_create_relationship_rows(tx, RelationType.CONTAINS.value, rows, batch_size)
+        return node_ids
+
+    def create_nodes_bulk(self, nodes: List[CodeNode], batch_size: int = 1000) -> List[str]:
+        """Create many nodes with one UNWIND query per label and batch; returns ids in input order"""
+        with self._get_session() as session:
+            return session.execute_write(self._tx_create_nodes, nodes, batch_size)
+
+    def create_relationships_bulk(self, relations: List[CodeRelation], batch_size: int = 1000) -> None:
+        """Create many relationships with one UNWIND query per relationship type and batch"""
+        with self._get_session() as session:
+            session.execute_write(self._tx_create_relationships, relations, batch_size)
+
+    def create_trees_bulk(self, nodes: List[NodeRow], parents: List[Union[int, str]], batch_size: int = 1000) -> List[str]:
+        """Create nodes plus CONTAINS edges in one write transaction; each parent is an index into nodes or an existing node id"""
+        with self._get_session() as session:
+            return session.execute_write(self._tx_create_trees, nodes, parents, batch_size)
+            
     def create_relationship(self, relation: CodeRelation) -> None:
         """Create a new relationship between nodes"""
         query = """
@@ -74,41 +211,49 @@ class Neo4jClient:
                 }
             )
             
+    @staticmethod
+    def _tx_get_node_by_id(tx, node_id: int) -> Optional[Dict]:
+        record = tx.run(
+            """
+            MATCH (n)
+            WHERE id(n) = $node_id
+            RETURN n
+            """,
+            {"node_id": node_id}
+        ).single()
+        if record:
+            return dict(record["n"].items())
+        return None
+            
     def get_node_by_id(self, node_id: str) -> Optional[Dict]:
         """Retrieve a node by its ID"""
-        query = """
-        MATCH (n)
-        WHERE id(n) = $node_id
-        RETURN n
-        """
-        
         with self._get_session() as session:
-            result = session.run(query, {"node_id": int(node_id)})
-            record = result.single()
-            if record:
-                node = record["n"]
-                return dict(node.items())
-            return None
+            return session.execute_read(self._tx_get_node_by_id, int(node_id))
+    
+    @staticmethod
+    def _tx_get_node_relationships(tx, node_id: int) -> List[Dict]:
+        result = tx.run(
+            """
+            MATCH (n)-[r]-(other)
+            WHERE id(n) = $node_id
+            RETURN type(r) as type, r as props, id(other) as other_id, labels(other) as other_labels
+            """,
+            {"node_id": node_id}
+        )
+        return [
+            {
+                "type": record["type"],
+                "properties": dict(record["props"].items()),
+                "other_id": str(record["other_id"]),
+                "other_labels": record["other_labels"]
+            }
+            for record in result
+        ]
             
     def get_node_relationships(self, node_id: str) -> List[Dict]:
         """Get all relationships for a node"""
-        query = """
-        MATCH (n)-[r]-(other)
-        WHERE id(n) = $node_id
-        RETURN type(r) as type, r as props, id(other) as other_id, labels(other) as other_labels
-        """
-        
         with self._get_session() as session:
-            result = session.run(query, {"node_id": int(node_id)})
-            return [
-                {
-                    "type": record["type"],
-                    "properties": dict(record["props"].items()),
-                    "other_id": str(record["other_id"]),
-                    "other_labels": record["other_labels"]
-                }
-                for record in result
-            ]
+            return session.execute_read(self._tx_get_node_relationships, int(node_id))
             
     def clear_database(self) -> None:
         """Clear all nodes and relationships from the database"""
@@ -116,40 +261,47 @@ class Neo4jClient:
         with self._get_session() as session:
             session.run(query)
             
-    def get_subgraph(self, root_id: str, depth: int = 2) -> Dict:
-        """Get a subgraph starting from a root node up to specified depth"""
-        query = """
-        MATCH path = (n)-[*..{depth}]-(m)
-        WHERE id(n) = $root_id
-        RETURN path
-        """.format(depth=depth)
+    @staticmethod
+    def _tx_get_subgraph(tx, root_id: int, depth: int) -> Dict:
+        # subgraphAll returns each node/relationship once, instead of one row per path
+        record = tx.run(
+            """
+            MATCH (n)
+            WHERE id(n) = $root_id
+            CALL apoc.path.subgraphAll(n, {maxLevel: $depth})
+            YIELD nodes, relationships
+            RETURN nodes, relationships
+            """,
+            {"root_id": root_id, "depth": depth}
+        ).single()
         
-        nodes = {}
-        relationships = []
+        if not record:
+            return {"nodes": [], "relationships": []}
         
-        with self._get_session() as session:
-            result = session.run(query, {"root_id": int(root_id)})
-            for record in result:
-                path = record["path"]
-                for node in path.nodes:
-                    if node.id not in nodes:
-                        nodes[node.id] = {
-                            "id": str(node.id),
-                            "labels": list(node.labels),
-                            "properties": dict(node.items())
-                        }
-                for rel in path.relationships:
-                    relationships.append({
-                        "source": str(rel.start_node.id),
-                        "target": str(rel.end_node.id),
-                        "type": rel.type,
-                        "properties": dict(rel.items())
-                    })
-                    
         return {
-            "nodes": list(nodes.values()),
-            "relationships": relationships
+            "nodes": [
+                {
+                    "id": str(node.id),
+                    "labels": list(node.labels),
+                    "properties": dict(node.items())
+                }
+                for node in record["nodes"]
+            ],
+            "relationships": [
+                {
+                    "source": str(rel.start_node.id),
+                    "target": str(rel.end_node.id),
+                    "type": rel.type,
+                    "properties": dict(rel.items())
+                }
+                for rel in record["relationships"]
+            ]
         }
+            
+    def get_subgraph(self, root_id: str, depth: int = 2) -> Dict:
+        """Get a subgraph starting from a root node up to specified depth"""
+        with self._get_session() as session:
+            return session.execute_read(self._tx_get_subgraph, int(root_id), int(depth))
 
     def get_or_create_root_node(self, node: CodeNode) -> str:
         """Get existing root node or create a new one"""
@@ -174,6 +326,22 @@ class Neo4jClient:
             )
             return str(result.single()["node_id"])
     
+    def delete_files_nodes(self, file_paths: List[str]):
+        """Delete all nodes associated with any of the given files in one transaction"""
+        if not file_paths:
+            return
+        with self._get_session() as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $file_paths AS file_path
+                    MATCH (n:Node {file_path: file_path})
+                    DETACH DELETE n
+                    """,
+                    file_paths=file_paths
+                ).consume()
+            )
+    
     def delete_file_nodes(self, file_path: str):
         """Delete all nodes associated with a specific file"""
         with self._get_session() as session:
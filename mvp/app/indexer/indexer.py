@@ -1,15 +1,130 @@
 import os
-import hashlib
+import re
+import json
+import fnmatch
+import itertools
+import logging
+import mmap
+import tempfile
+import multiprocessing
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple, Generator, Any
-import gitignore_parser
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Generator, Any, Union, Iterable, Iterator, Pattern
+import pathspec
+import xxhash
+import diskcache
+from dataclasses import dataclass
 
 from ..config import settings
-from ..database.models import ASTNode, CodeNode, CodeRelation, NodeType, RelationType, Position
-from ..database.neo4j_client import db_client
+from ..database.models import ASTNode, CodeNode, NodeType, Position
+from ..database.neo4j_client import NodeRow, db_client, node_properties
 from .parser import PythonParser
 from .js_parser import JavaScriptParser
 
+logger = logging.getLogger(__name__)
+
+# Hashes only detect content changes, so a fast non-cryptographic hash is enough.
+# Stored hashes carry this tag, so hashes from another algorithm never compare equal.
+HASH_ALGORITHM = "xxh3_128"
+# Files at least this large are hashed from a memory map in a single call;
+# smaller ones are read whole, where mapping would cost more than it saves
+HASH_MMAP_THRESHOLD = 64 * 1024
+# Threads hashing changed files during incremental runs; reads and hashing release the GIL
+HASH_WORKERS = os.cpu_count() or 1
+# Parsed nodes are buffered across files and written once this many are pending
+WRITE_BATCH_SIZE = 1000
+# Parsing is pure-Python CPU work, so it runs in worker processes rather than threads.
+# Runs with fewer files to parse than PARSE_PROCESS_MIN_FILES parse in-process, where
+# starting the workers would cost more than it saves
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_PROCESS_MIN_FILES = 64
+PARSE_CHUNK_SIZE = 16
+# Part of every AST cache key; bump it whenever the parsers' output or ASTNode changes,
+# so ASTs pickled by an older version are never served (they age out of the cache)
+AST_CACHE_VERSION = 1
+
+def _parse_file(parser_class: Any, file_path: Path) -> Optional[ASTNode]:
+    """Parse one file; module-level so worker processes can run it"""
+    return parser_class.parse_file(file_path)
+
+def _compile_match_patterns(patterns: Iterable[str]) -> Tuple[Dict[int, Pattern], List[str]]:
+    """Compile Path.match-style patterns into one regex per pattern length, plus any absolute patterns"""
+    # Path.match compares a relative pattern with the path's last N components,
+    # so patterns sharing N are joined into one regex over those components
+    grouped: Dict[int, List[str]] = {}
+    absolute = []
+    for pattern in patterns:
+        if not pattern:
+            continue
+        pure = Path(pattern)
+        if pure.is_absolute():
+            absolute.append(pattern)
+        else:
+            grouped.setdefault(len(pure.parts), []).append(fnmatch.translate('/'.join(pure.parts)))
+    # Path.match follows the platform's case sensitivity
+    flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+    return {n: re.compile('|'.join(regexes), flags) for n, regexes in grouped.items()}, absolute
+
+@dataclass(slots=True)
+class _NodeRef:
+    """Handle to a queued node: its index in the pending batch until written, then its graph id"""
+    index: int
+    id: Optional[str] = None
+    failed: bool = False
+
+class _BatchWriter:
+    """Streams nodes and their CONTAINS links into the graph in bounded batches"""
+    
+    def __init__(self, root_id: str, limit: int = WRITE_BATCH_SIZE):
+        self._root_id = root_id
+        self._limit = limit
+        self._nodes: List[NodeRow] = []
+        self._parents: List[Union[int, str]] = []
+        self._refs: List[_NodeRef] = []
+        self._files: List[Path] = []
+        # Files with nodes in a batch that could not be written
+        self.failed_files: Set[Path] = set()
+    
+    def add(self, node: NodeRow, parent: Optional[_NodeRef], file_path: Path) -> _NodeRef:
+        """Queue a node under parent (the repository root when None), flushing when the batch is full"""
+        if parent is not None and parent.failed:
+            # The parent's batch was lost and the file is already marked failed
+            return parent
+        
+        ref = _NodeRef(index=len(self._nodes))
+        self._nodes.append(node)
+        if parent is None:
+            self._parents.append(self._root_id)
+        else:
+            self._parents.append(parent.id if parent.id is not None else parent.index)
+        self._refs.append(ref)
+        if not self._files or self._files[-1] != file_path:
+            self._files.append(file_path)
+        
+        if len(self._nodes) >= self._limit:
+            self.flush()
+        return ref
+    
+    def flush(self) -> None:
+        """Write all queued nodes and their CONTAINS relationships"""
+        nodes, parents, refs, files = self._nodes, self._parents, self._refs, self._files
+        self._nodes, self._parents, self._refs, self._files = [], [], [], []
+        if not nodes:
+            return
+        
+        try:
+            # Nodes and their CONTAINS edges commit together, so a failed batch leaves no partial trees
+            node_ids = db_client.create_trees_bulk(nodes, parents)
+        except Exception as e:
+            logger.warning("Error writing %d indexed files: %s", len(files), e)
+            self.failed_files.update(files)
+            for ref in refs:
+                ref.failed = True
+            return
+        
+        for ref, node_id in zip(refs, node_ids):
+            ref.id = node_id
+
 class CodeIndexer:
     def __init__(self):
         self.parsers = {
@@ -20,18 +135,80 @@ class CodeIndexer:
             ".tsx": JavaScriptParser,
         }
         self._current_repo_path: Optional[Path] = None
-        self._gitignore_matcher = None
-        self._file_hashes: Dict[str, str] = {}
+        # Length of the repository path plus separator; relative paths are sliced off with it
+        self._repo_prefix_len = 0
+        self._gitignore_spec: Optional[pathspec.PathSpec] = None
+        # Settings for the repository being indexed, looked up once per index run
+        self._repo_settings: Dict[str, Any] = {}
+        self._max_file_size_mb = settings.skip_files_larger_than_mb
+        # Repository ignore_patterns as one regex per pattern length (see _compile_match_patterns)
+        self._repo_ignore_regexes: Dict[int, Pattern] = {}
+        self._repo_ignore_absolute: List[str] = []
+        # rel_path -> (size, mtime_ns, hash); persisted per repository in settings.data_dir
+        self._file_hashes: Dict[str, Tuple[int, int, str]] = {}
+        # Writes parsed nodes during index_repository
+        self._writer: Optional[_BatchWriter] = None
+        # Parsed ASTs keyed by file path and content hash, opened on first use
+        self._ast_cache: Optional[diskcache.Cache] = None
+    
+    def _relative_path(self, file_path: Union[Path, str]) -> str:
+        """Path of a walked file relative to the current repository"""
+        # Walked paths always start with the repository prefix, so a slice replaces relative_to
+        return os.fspath(file_path)[self._repo_prefix_len:]
     
     def _compute_file_hash(self, file_path: Path) -> str:
-        """Compute SHA-256 hash of a file"""
-        sha256_hash = hashlib.sha256()
+        """Compute a tagged xxHash3 (128-bit) digest of a file"""
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            if os.fstat(f.fileno()).st_size < HASH_MMAP_THRESHOLD:
+                digest = xxhash.xxh3_128(f.read()).hexdigest()
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    digest = xxhash.xxh3_128(mm).hexdigest()
+        return f"{HASH_ALGORITHM}:{digest}"
+    
+    def _get_hash_cache_path(self, repo_path: Path) -> str:
+        """Get the path of the file hash cache for a repository"""
+        repo_key = xxhash.xxh3_64_hexdigest(str(repo_path).encode("utf-8"))
+        return os.path.join(settings.data_dir, f"file_hashes_{repo_key}.json")
+    
+    def _load_file_hashes(self, repo_path: Path) -> None:
+        """Load the file hash cache for a repository from disk"""
+        self._file_hashes = {}
+        cache_file = self._get_hash_cache_path(repo_path)
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self._file_hashes = {rel_path: tuple(entry) for rel_path, entry in json.load(f).items()}
+            except (json.JSONDecodeError, IOError, TypeError) as e:
+                logger.error("Error loading file hashes for %s: %s", repo_path, e)
+    
+    def _save_file_hashes(self, repo_path: Path) -> None:
+        """Save the file hash cache for a repository to disk"""
+        cache_file = self._get_hash_cache_path(repo_path)
+        # Write a temporary file and rename it over the cache, so a crash mid-write
+        # never leaves a truncated cache that would force a full re-hash
+        tmp_file = None
+        try:
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._file_hashes, f)
+            os.replace(tmp_file, cache_file)
+        except IOError as e:
+            logger.error("Error saving file hashes for %s: %s", repo_path, e)
+            if tmp_file and os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+    
+    def _get_ast_cache(self) -> diskcache.Cache:
+        """Get the on-disk cache of parsed ASTs, opening it if necessary"""
+        if self._ast_cache is None:
+            self._ast_cache = diskcache.Cache(
+                os.path.join(settings.data_dir, "ast_cache"),
+                size_limit=settings.ast_cache_size_mb * 1024 * 1024,
+                eviction_policy="least-recently-used"
+            )
+        return self._ast_cache
     
-    def _get_changed_files(self, repo_path: Path) -> Tuple[Set[Path], Set[Path], Set[Path]]:
+    def _get_changed_files(self, repo_path: Path, entries: List[os.DirEntry]) -> Tuple[Set[Path], Set[Path], Set[Path]]:
         """
         Get lists of modified, added, and deleted files by comparing with stored hashes
         Returns: (modified_files, added_files, deleted_files)
@@ -40,34 +217,48 @@ class CodeIndexer:
         modified_files = set()
         added_files = set()
         
+        # Files whose stat signature changed (or that are new) are hashed in parallel
+        to_hash: List[Tuple[Path, str, os.stat_result]] = []
+        
         # Check for modified and added files
-        for file_path in self._walk_repository(repo_path):
-            rel_path = str(file_path.relative_to(repo_path))
+        for entry in entries:
+            # Slice the entry's path string directly rather than converting a Path back to str
+            rel_path = self._relative_path(entry.path)
             current_files.add(rel_path)
             
-            if not self._should_index_file(file_path):
+            file_path = Path(entry.path)
+            if not self._should_index_file(file_path, entry):
                 continue
             
-            current_hash = self._compute_file_hash(file_path)
-            if rel_path in self._file_hashes:
-                if current_hash != self._file_hashes[rel_path]:
-                    modified_files.add(file_path)
-            else:
-                added_files.add(file_path)
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
             
-            self._file_hashes[rel_path] = current_hash
+            # Unchanged size and mtime means unchanged content, so skip reading the file
+            cached = self._file_hashes.get(rel_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                continue
+            to_hash.append((file_path, rel_path, stat))
         
-        # Check for deleted files
-        deleted_files = {
-            repo_path / rel_path
-            for rel_path in self._file_hashes.keys()
-            if rel_path not in current_files
-        }
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            hashes = pool.map(self._compute_file_hash, [file_path for file_path, _, _ in to_hash])
+            for (file_path, rel_path, stat), current_hash in zip(to_hash, hashes):
+                cached = self._file_hashes.get(rel_path)
+                if cached:
+                    if current_hash != cached[2]:
+                        modified_files.add(file_path)
+                else:
+                    added_files.add(file_path)
+                
+                self._file_hashes[rel_path] = (stat.st_size, stat.st_mtime_ns, current_hash)
         
-        # Remove deleted files from hash cache
-        for file_path in deleted_files:
-            rel_path = str(file_path.relative_to(repo_path))
+        # Check for deleted files, removing them from the hash cache
+        deleted_rel_paths = [rel_path for rel_path in self._file_hashes if rel_path not in current_files]
+        deleted_files = set()
+        for rel_path in deleted_rel_paths:
             del self._file_hashes[rel_path]
+            deleted_files.add(repo_path / rel_path)
         
         return modified_files, added_files, deleted_files
     
@@ -78,24 +269,26 @@ class CodeIndexer:
             raise ValueError(f"Repository path does not exist: {repo_path}")
         
         self._current_repo_path = repo_path
+        self._repo_prefix_len = len(os.path.join(str(repo_path), ""))
         self._setup_gitignore(repo_path)
+        self._load_file_hashes(repo_path)
         
-        # Check repository size if needed
-        if settings.skip_repositories_larger_than_gb > 0:
-            repo_size_gb = sum(f.stat().st_size for f in repo_path.glob('**/*') if f.is_file()) / (1024**3)
-            if repo_size_gb > settings.skip_repositories_larger_than_gb:
-                return {
-                    "repository": str(repo_path),
-                    "indexed_files": 0,
-                    "skipped_files": 0,
-                    "errors": [f"Repository exceeds maximum size limit of {settings.skip_repositories_larger_than_gb}GB"],
-                    "status": "skipped",
-                    "root_node_id": None
-                }
+        # Walk the repository once, checking its size along the way
+        entries = self._scan_repository(repo_path)
+        if entries is None:
+            return {
+                "repository": str(repo_path),
+                "indexed_files": 0,
+                "skipped_files": 0,
+                "errors": [f"Repository exceeds maximum size limit of {settings.skip_repositories_larger_than_gb}GB"],
+                "status": "skipped",
+                "root_node_id": None
+            }
         
         indexed_files = 0
         skipped_files = 0
         errors = []
+        db_client.ensure_indexes()
         
         # Get or create repository root node
         root_node = CodeNode(
@@ -106,51 +299,63 @@ class CodeIndexer:
             properties={"is_root": True}
         )
         root_id = db_client.get_or_create_root_node(root_node)
+        self._writer = _BatchWriter(root_id)
         
         if incremental:
             # Get lists of changed files
-            modified_files, added_files, deleted_files = self._get_changed_files(repo_path)
+            modified_files, added_files, deleted_files = self._get_changed_files(repo_path, entries)
             
-            # Remove deleted files from the graph
-            for file_path in deleted_files:
-                db_client.delete_file_nodes(str(file_path.relative_to(repo_path)))
-                skipped_files += 1
+            # Remove deleted files and stale nodes of modified files from the graph in one transaction
+            db_client.delete_files_nodes([self._relative_path(file_path) for file_path in deleted_files | modified_files])
+            skipped_files += len(deleted_files)
             
-            # Update modified files
-            for file_path in modified_files:
-                db_client.delete_file_nodes(str(file_path.relative_to(repo_path)))
-                if self._index_file(file_path, root_id):
-                    indexed_files += 1
-                else:
-                    skipped_files += 1
-            
-            # Add new files
-            for file_path in added_files:
-                if self._index_file(file_path, root_id):
-                    indexed_files += 1
-                else:
-                    skipped_files += 1
+            # Update modified files and add new ones
+            indexed, skipped = self._index_files(list(modified_files) + list(added_files))
+            indexed_files += indexed
+            skipped_files += skipped
         else:
             # Clear existing data and do a full index
             db_client.clear_database()
             self._file_hashes.clear()
             
-            for file_path in self._walk_repository(repo_path):
+            to_index = []
+            for entry in entries:
+                file_path = Path(entry.path)
                 try:
-                    if self._should_index_file(file_path):
+                    if self._should_index_file(file_path, entry):
                         # Compute and store file hash
-                        rel_path = str(file_path.relative_to(repo_path))
-                        self._file_hashes[rel_path] = self._compute_file_hash(file_path)
-                        
-                        if self._index_file(file_path, root_id):
-                            indexed_files += 1
-                        else:
-                            skipped_files += 1
+                        rel_path = self._relative_path(entry.path)
+                        stat = entry.stat()
+                        self._file_hashes[rel_path] = (stat.st_size, stat.st_mtime_ns, self._compute_file_hash(file_path))
+                        to_index.append(file_path)
                     else:
                         skipped_files += 1
                 except Exception as e:
                     errors.append(f"Error indexing {file_path}: {str(e)}")
                     skipped_files += 1
+            
+            indexed, skipped = self._index_files(to_index)
+            indexed_files += indexed
+            skipped_files += skipped
+        
+        self._writer.flush()
+        failed_files = self._writer.failed_files
+        self._writer = None
+        if failed_files:
+            # Files can straddle batches, so drop whatever part of them was written;
+            # forgetting the hash makes the next incremental run retry them
+            failed_rel_paths = [self._relative_path(file_path) for file_path in failed_files]
+            try:
+                db_client.delete_files_nodes(failed_rel_paths)
+            except Exception as e:
+                logger.warning("Error removing partially written files: %s", e)
+            for rel_path in failed_rel_paths:
+                self._file_hashes.pop(rel_path, None)
+                errors.append(f"Error writing {rel_path} to the graph database")
+            indexed_files -= len(failed_files)
+            skipped_files += len(failed_files)
+        
+        self._save_file_hashes(repo_path)
         
         return {
             "repository": str(repo_path),
@@ -161,152 +366,197 @@ class CodeIndexer:
         }
     
     def _setup_gitignore(self, repo_path: Path) -> None:
-        """Set up gitignore matcher for the repository"""
+        """Compile the repository's .gitignore and ignore settings once per index run"""
+        self._repo_settings = settings.repository_settings.get(str(repo_path), {})
+        self._max_file_size_mb = self._repo_settings.get('max_file_size_mb', settings.skip_files_larger_than_mb)
+        self._repo_ignore_regexes, self._repo_ignore_absolute = _compile_match_patterns(
+            self._repo_settings.get('ignore_patterns', ())
+        )
+        
         gitignore_path = repo_path / ".gitignore"
         if gitignore_path.exists():
-            self._gitignore_matcher = gitignore_parser.parse_gitignore(gitignore_path)
+            with open(gitignore_path, encoding='utf-8', errors='replace') as f:
+                self._gitignore_spec = pathspec.GitIgnoreSpec.from_lines(f)
         else:
-            self._gitignore_matcher = None
+            self._gitignore_spec = None
+    
+    def _scan_repository(self, repo_path: Path) -> Optional[List[os.DirEntry]]:
+        """List the repository's files, or return None once they exceed the repository size limit"""
+        max_bytes = settings.skip_repositories_larger_than_gb * 1024**3
+        entries = []
+        total_bytes = 0
+        for entry in self._walk_repository(repo_path):
+            if max_bytes > 0:
+                # DirEntry caches this stat, so later checks on the entry reuse it
+                try:
+                    total_bytes += entry.stat().st_size
+                except OSError:
+                    pass
+                if total_bytes > max_bytes:
+                    return None
+            entries.append(entry)
+        return entries
     
-    def _walk_repository(self, repo_path: Path) -> Generator[Path, None, None]:
-        """Walk through repository and yield file paths"""
-        for root, dirs, files in os.walk(repo_path):
-            # Skip common directories we don't want to index
-            dirs[:] = [d for d in dirs if not self._should_skip_directory(d)]
+    def _walk_repository(self, repo_path: Path) -> Generator[os.DirEntry, None, None]:
+        """Walk through repository and yield file entries"""
+        # scandir reports entry types without a stat per entry; like os.walk,
+        # symlinked directories are not followed
+        stack = [str(repo_path)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
             
-            for file in files:
-                yield Path(root) / file
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Skip common directories we don't want to index
+                        if not entry.is_symlink() and not self._should_skip_directory(entry.name):
+                            stack.append(entry.path)
+                    else:
+                        yield entry
+                except OSError:
+                    continue
     
     def _should_skip_directory(self, dirname: str) -> bool:
         """Check if a directory should be skipped"""
         # Check if the directory is in the skip list
-        if dirname in settings.skip_directories:
+        if settings.is_skipped_directory(dirname):
             return True
         
         # Check if it starts with a dot (hidden directory)
         if dirname.startswith("."):
             return True
         
-        # Get repository-specific settings if available
-        repo_path_str = str(self._current_repo_path) if self._current_repo_path else None
-        if repo_path_str and repo_path_str in settings.repository_settings:
-            repo_settings = settings.repository_settings[repo_path_str]
-            # Check custom include/exclude directories
-            if 'include_dirs' in repo_settings and dirname not in repo_settings['include_dirs']:
-                return True
-            if 'exclude_dirs' in repo_settings and dirname in repo_settings['exclude_dirs']:
-                return True
+        # Check custom include/exclude directories
+        repo_settings = self._repo_settings
+        if 'include_dirs' in repo_settings and dirname not in repo_settings['include_dirs']:
+            return True
+        if 'exclude_dirs' in repo_settings and dirname in repo_settings['exclude_dirs']:
+            return True
         
         return False
     
-    def _should_index_file(self, file_path: Path) -> bool:
-        """Check if a file should be indexed"""
-        # Skip files that are too large
-        try:
-            file_size_mb = file_path.stat().st_size / (1024 * 1024)
-            max_size = settings.skip_files_larger_than_mb
-            
-            # Check repository-specific settings
-            repo_path_str = str(self._current_repo_path) if self._current_repo_path else None
-            if repo_path_str and repo_path_str in settings.repository_settings:
-                repo_settings = settings.repository_settings[repo_path_str]
-                if 'max_file_size_mb' in repo_settings:
-                    max_size = repo_settings['max_file_size_mb']
-            
-            if file_size_mb > max_size:
-                return False
-        except OSError:
-            return False
-        
-        # Check gitignore
-        if self._gitignore_matcher and self._gitignore_matcher(str(file_path)):
-            return False
-        
+    def _matches_repo_ignore(self, file_path: Path) -> bool:
+        """Check a file against the repository's ignore_patterns, compiled in _setup_gitignore"""
+        parts = file_path.parts
+        for n, regex in self._repo_ignore_regexes.items():
+            if len(parts) > n and regex.match('/'.join(parts[-n:])):
+                return True
+        return any(file_path.match(pattern) for pattern in self._repo_ignore_absolute)
+    
+    def _should_index_file(self, file_path: Path, entry: Optional[os.DirEntry] = None) -> bool:
+        """Check if a file should be indexed, reusing the walk's cached stat when given its entry"""
+        # Name-only checks come first so most files are rejected without a stat
         # Check file extension against supported languages
         if file_path.suffix not in self.parsers:
             return False
         
         # Check against ignore patterns
-        for pattern in settings.ignore_patterns:
-            if file_path.match(pattern):
-                return False
+        if settings.is_ignored_filename(file_path.name):
+            return False
         
         # Check repository-specific patterns
-        if repo_path_str and repo_path_str in settings.repository_settings:
-            repo_settings = settings.repository_settings[repo_path_str]
-            if 'ignore_patterns' in repo_settings:
-                for pattern in repo_settings['ignore_patterns']:
-                    if file_path.match(pattern):
-                        return False
+        if self._matches_repo_ignore(file_path):
+            return False
         
-        return True
-    
-    def _index_file(self, file_path: Path, root_id: str) -> bool:
-        """Index a single file and store its AST in the graph database"""
-        parser_class = self.parsers.get(file_path.suffix)
-        if not parser_class:
+        # Check gitignore
+        if self._gitignore_spec and self._gitignore_spec.match_file(self._relative_path(file_path)):
             return False
         
+        # Skip files that are too large
         try:
-            # Parse the file
-            ast_node = parser_class.parse_file(file_path)
-            if not ast_node:
-                return False
-            
-            # Convert AST to graph nodes and relationships
-            nodes_to_create: List[CodeNode] = []
-            relationships_to_create: List[CodeRelation] = []
+            file_size_mb = (entry or file_path).stat().st_size / (1024 * 1024)
+        except OSError:
+            return False
+        if file_size_mb > self._max_file_size_mb:
+            return False
+        
+        return True
+    
+    def _index_files(self, file_paths: List[Path]) -> Tuple[int, int]:
+        """Index files, parsing those not in the AST cache in worker processes; returns (indexed, skipped) counts"""
+        indexed = 0
+        skipped = 0
+        # (file path, parser, cache key) of files that need parsing
+        to_parse: List[Tuple[Path, Any, Optional[str]]] = []
+        
+        for file_path in file_paths:
+            parser_class = self.parsers.get(file_path.suffix)
+            if not parser_class:
+                skipped += 1
+                continue
             
-            def process_ast_node(node: ASTNode, parent_id: Optional[str] = None) -> str:
-                # Create CodeNode from ASTNode
-                code_node = CodeNode(
-                    name=node.name,
-                    type=node.type,
-                    file_path=str(file_path.relative_to(self._current_repo_path)),
-                    position=node.position,
-                    properties=node.properties
-                )
-                
-                # Store node
-                node_id = db_client.create_node(code_node)
-                
-                # Create relationship to parent if exists
-                if parent_id:
-                    relationships_to_create.append(
-                        CodeRelation(
-                            source_id=parent_id,
-                            target_id=node_id,
-                            type=RelationType.CONTAINS
-                        )
-                    )
-                
-                # Process children
-                for child in node.children:
-                    process_ast_node(child, node_id)
-                
-                return node_id
+            # Files already hashed this run can reuse the AST parsed from identical content;
+            # the path is part of the key because parsers record it in the module node
+            file_hash = self._file_hashes.get(self._relative_path(file_path))
+            cache_key = f"{AST_CACHE_VERSION}:{file_path}:{file_hash[2]}" if file_hash else None
+            ast_node = self._get_ast_cache().get(cache_key) if cache_key else None
             
-            # Start processing from root AST node
-            file_node_id = process_ast_node(ast_node)
+            if ast_node is None:
+                to_parse.append((file_path, parser_class, cache_key))
+            elif self._queue_ast(file_path, ast_node):
+                indexed += 1
+            else:
+                skipped += 1
+        
+        # Files left without a result by a failed worker pool come back as None
+        for (file_path, _, cache_key), ast_node in itertools.zip_longest(to_parse, self._parse_files(to_parse)):
+            if not ast_node:
+                skipped += 1
+                continue
+            if cache_key:
+                self._get_ast_cache().set(cache_key, ast_node)
+            if self._queue_ast(file_path, ast_node):
+                indexed += 1
+            else:
+                skipped += 1
+        
+        return indexed, skipped
+    
+    def _parse_files(self, to_parse: List[Tuple[Path, Any, Optional[str]]]) -> Iterator[Optional[ASTNode]]:
+        """Parse files in order, in worker processes when there are enough of them"""
+        parser_classes = [parser_class for _, parser_class, _ in to_parse]
+        file_paths = [file_path for file_path, _, _ in to_parse]
+        if len(to_parse) < PARSE_PROCESS_MIN_FILES or PARSE_WORKERS < 2:
+            yield from map(_parse_file, parser_classes, file_paths)
+            return
+        
+        # Spawned rather than forked workers: forking would copy the database driver's threads and locks
+        with ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+            try:
+                yield from pool.map(_parse_file, parser_classes, file_paths, chunksize=PARSE_CHUNK_SIZE)
+            except Exception as e:
+                # A worker died (e.g. killed for memory); files without a result count as unparsed
+                logger.warning("Error parsing files in worker processes: %s", e)
+    
+    def _queue_ast(self, file_path: Path, ast_node: ASTNode) -> bool:
+        """Queue a parsed file's AST for writing to the graph database"""
+        try:
+            rel_file_path = self._relative_path(file_path)
             
-            # Create relationship to repository root
-            db_client.create_relationship(
-                CodeRelation(
-                    source_id=root_id,
-                    target_id=file_node_id,
-                    type=RelationType.CONTAINS
+            # Stream the AST into the batch writer; memory stays bounded by the batch size.
+            # Nodes go in as the label and property rows the write queries take, with no
+            # intermediate CodeNode per AST node
+            stack: List[Tuple[ASTNode, Optional[_NodeRef]]] = [(ast_node, None)]
+            while stack:
+                node, parent_ref = stack.pop()
+                ref = self._writer.add(
+                    (node.type.value, node_properties(node.name, rel_file_path, node.position, node.properties)),
+                    parent_ref,
+                    file_path
                 )
-            )
-            
-            # Create all relationships
-            for rel in relationships_to_create:
-                db_client.create_relationship(rel)
-            
-            return True
+                for child in reversed(node.children):
+                    stack.append((child, ref))
             
         except Exception as e:
-            print(f"Error indexing file {file_path}: {e}")
+            logger.warning("Error indexing file %s: %s", file_path, e)
             return False
+        
+        return True
 
 # Create global indexer instance
 indexer = CodeIndexer() 
\ No newline at end of file
@@ -1,9 +1,33 @@
-from typing import Optional, Dict, List
-import esprima
+import logging
+import functools
+import mmap
+import os
+from typing import Optional, Dict, List, Tuple, Union
 from pathlib import Path
+from tree_sitter import Language, Node, Parser
+import tree_sitter_javascript
+import tree_sitter_typescript
 
 from ..database.models import ASTNode, NodeType, Position
 
+logger = logging.getLogger(__name__)
+
+# Tree-sitter grammar per file extension; the JavaScript grammar also covers JSX
+_LANGUAGES = {
+    ".js": tree_sitter_javascript.language,
+    ".jsx": tree_sitter_javascript.language,
+    ".ts": tree_sitter_typescript.language_typescript,
+    ".tsx": tree_sitter_typescript.language_tsx,
+}
+
+# Sources are parsed from a read-only memory map; empty files, which can't be mapped, as bytes
+Source = Union[bytes, mmap.mmap]
+
+@functools.lru_cache(maxsize=None)
+def _get_parser(suffix: str) -> Parser:
+    """Get the tree-sitter parser for a file extension"""
+    return Parser(Language(_LANGUAGES.get(suffix, tree_sitter_javascript.language)()))
+
 class JavaScriptParser:
     """Parser for JavaScript/TypeScript source code that generates an AST representation"""
     
@@ -11,74 +35,122 @@ class JavaScriptParser:
     def parse_file(file_path: Path) -> Optional[ASTNode]:
         """Parse a JS/TS file and return its AST representation"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                source = f.read()
-            
-            tree = esprima.parseModule(source, options={'loc': True, 'range': True})
-            return JavaScriptParser._process_node(tree, source, str(file_path))
+            with open(file_path, 'rb') as f:
+                # Tree-sitter reads any buffer, so the file is never copied into a bytes object
+                if os.fstat(f.fileno()).st_size == 0:
+                    return JavaScriptParser._parse_source(b'', file_path)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                    return JavaScriptParser._parse_source(source, file_path)
         except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
+            logger.warning("Error parsing %s: %s", file_path, e)
+            return None
+    
+    @staticmethod
+    def _parse_source(source: Source, file_path: Path) -> Optional[ASTNode]:
+        """Parse source held in memory"""
+        tree = _get_parser(Path(file_path).suffix).parse(source)
+        # Tree-sitter recovers from syntax errors; skip such files as a strict parser would
+        if tree.root_node.has_error:
+            raise SyntaxError("source contains syntax errors")
+        return JavaScriptParser._process_node(tree.root_node, source, str(file_path))
+    
+    @staticmethod
+    def _text(node: Optional[Node], source: Source) -> Optional[str]:
+        """Get the source text spanned by a node"""
+        if node is None:
+            return None
+        return source[node.start_byte:node.end_byte].decode('utf-8')
+    
+    @staticmethod
+    def _has_token(node: Node, token: str) -> bool:
+        """Check whether a keyword or punctuation token appears directly in a node"""
+        return any(child.type == token for child in node.children if not child.is_named)
+    
+    @staticmethod
+    def _get_node_position(node: Node) -> Position:
+        """Extract position information from a tree-sitter node"""
+        return Position(
+            start_line=node.start_point[0] + 1,
+            end_line=node.end_point[0] + 1,
+            start_col=node.start_point[1],
+            end_col=node.end_point[1]
+        )
+    
+    @staticmethod
+    def _process_node(node: Node, source: Source, file_path: str) -> Optional[ASTNode]:
+        """Process an AST node and its children with an explicit stack"""
+        root = JavaScriptParser._process_single(node, source, file_path)
+        if root is None:
             return None
+        
+        stack: List[Tuple[Node, ASTNode]] = [(node, root)]
+        while stack:
+            parent, processed_parent = stack.pop()
+            for child in JavaScriptParser._child_nodes(parent):
+                if processed := JavaScriptParser._process_single(child, source, file_path):
+                    processed_parent.children.append(processed)
+                    stack.append((child, processed))
+        return root
     
     @staticmethod
-    def _get_node_position(node) -> Position:
-        """Extract position information from an Esprima node"""
-        if hasattr(node, 'loc'):
-            return Position(
-                start_line=node.loc.start.line,
-                end_line=node.loc.end.line,
-                start_col=node.loc.start.column,
-                end_col=node.loc.end.column
-            )
-        return Position(start_line=0, end_line=0)
+    def _child_nodes(node: Node) -> List[Node]:
+        """Statements whose declarations become children of a processed node"""
+        if node.type == 'program':
+            children = []
+            for child in node.named_children:
+                # Exported declarations are indexed like their unexported forms
+                if child.type == 'export_statement' and child.child_by_field_name('declaration'):
+                    child = child.child_by_field_name('declaration')
+                children.append(child)
+            return children
+        elif node.type in ('class_declaration', 'abstract_class_declaration'):
+            body = node.child_by_field_name('body')
+            return body.named_children if body else []
+        return []
     
     @staticmethod
-    def _process_node(node, source: str, file_path: str) -> Optional[ASTNode]:
-        """Process an AST node and its children recursively"""
-        if node.type == 'Program':
+    def _process_single(node: Node, source: Source, file_path: str) -> Optional[ASTNode]:
+        """Process one AST node, without its children"""
+        if node.type == 'program':
             return JavaScriptParser._process_program(node, source, file_path)
-        elif node.type == 'ClassDeclaration':
+        elif node.type in ('class_declaration', 'abstract_class_declaration'):
             return JavaScriptParser._process_class(node, source, file_path)
-        elif node.type == 'FunctionDeclaration':
+        elif node.type in ('function_declaration', 'generator_function_declaration'):
             return JavaScriptParser._process_function(node, source, file_path)
-        elif node.type == 'MethodDefinition':
+        elif node.type == 'method_definition':
             return JavaScriptParser._process_method(node, source, file_path)
-        elif node.type == 'ImportDeclaration':
+        elif node.type == 'import_statement':
             return JavaScriptParser._process_import(node, source, file_path)
         return None
     
     @staticmethod
-    def _process_program(node, source: str, file_path: str) -> ASTNode:
+    def _process_program(node: Node, source: Source, file_path: str) -> ASTNode:
         """Process a program (module) node"""
-        children = []
-        for child in node.body:
-            if processed := JavaScriptParser._process_node(child, source, file_path):
-                children.append(processed)
-        
         return ASTNode(
             type=NodeType.MODULE,
             name=Path(file_path).name,
-            position=Position(start_line=1, end_line=len(source.splitlines())),
-            children=children,
+            # The program node ends at end of file; a final newline doesn't start another line
+            position=Position(start_line=1, end_line=node.end_point[0] + (1 if node.end_point[1] else 0)),
             properties={"file_path": file_path}
         )
     
     @staticmethod
-    def _process_class(node, source: str, file_path: str) -> ASTNode:
+    def _process_class(node: Node, source: Source, file_path: str) -> ASTNode:
         """Process a class declaration node"""
-        children = []
-        for element in node.body.body:  # class body contains a list of methods
-            if processed := JavaScriptParser._process_node(element, source, file_path):
-                children.append(processed)
-        
-        # Get superclass if exists
-        superclass = node.superClass.name if node.superClass else None
+        # Get superclass if exists: `extends X` is a bare expression in JS and an
+        # extends_clause in TypeScript
+        superclass = None
+        heritage = next((child for child in node.named_children if child.type == 'class_heritage'), None)
+        if heritage and heritage.named_children:
+            extends = heritage.named_children[0]
+            if extends.type == 'extends_clause':
+                extends = extends.child_by_field_name('value')
+            superclass = JavaScriptParser._text(extends, source)
         
         return ASTNode(
             type=NodeType.CLASS,
-            name=node.id.name,
+            name=JavaScriptParser._text(node.child_by_field_name('name'), source),
             position=JavaScriptParser._get_node_position(node),
-            children=children,
             properties={
                 "superclass": superclass,
                 "decorators": []  # TODO: Add decorator support for TypeScript
@@ -86,59 +158,97 @@ class JavaScriptParser:
         )
     
     @staticmethod
-    def _process_function(node, source: str, file_path: str) -> ASTNode:
+    def _param_names(params: Optional[Node], source: Source) -> List[str]:
+        """Get parameter names from a formal_parameters node"""
+        if params is None:
+            return []
+        names = []
+        for param in params.named_children:
+            # TypeScript wraps parameters in required_parameter/optional_parameter
+            if param.type in ('required_parameter', 'optional_parameter'):
+                param = param.child_by_field_name('pattern') or param
+            # Default values: keep the bound name only
+            if param.type == 'assignment_pattern':
+                param = param.child_by_field_name('left') or param
+            if param.type == 'comment':
+                continue
+            names.append(JavaScriptParser._text(param, source))
+        return names
+    
+    @staticmethod
+    def _process_function(node: Node, source: Source, file_path: str) -> ASTNode:
         """Process a function declaration node"""
-        params = [param.name for param in node.params]
+        params = JavaScriptParser._param_names(node.child_by_field_name('parameters'), source)
         
         return ASTNode(
             type=NodeType.FUNCTION,
-            name=node.id.name,
+            name=JavaScriptParser._text(node.child_by_field_name('name'), source),
             position=JavaScriptParser._get_node_position(node),
             properties={
                 "params": params,
-                "is_async": getattr(node, "async", False),
-                "is_generator": getattr(node, "generator", False)
+                "is_async": JavaScriptParser._has_token(node, 'async'),
+                "is_generator": node.type == 'generator_function_declaration'
             }
         )
     
     @staticmethod
-    def _process_method(node, source: str, file_path: str) -> ASTNode:
+    def _process_method(node: Node, source: Source, file_path: str) -> ASTNode:
         """Process a method definition node"""
-        params = [param.name for param in node.value.params]
+        params = JavaScriptParser._param_names(node.child_by_field_name('parameters'), source)
+        name_node = node.child_by_field_name('name')
+        name = JavaScriptParser._text(name_node, source)
+        
+        if JavaScriptParser._has_token(node, 'get'):
+            kind = 'get'
+        elif JavaScriptParser._has_token(node, 'set'):
+            kind = 'set'
+        elif name == 'constructor':
+            kind = 'constructor'
+        else:
+            kind = 'method'
         
         return ASTNode(
             type=NodeType.METHOD,
-            name=node.key.name,
+            name=name,
             position=JavaScriptParser._get_node_position(node),
             properties={
                 "params": params,
-                "kind": node.kind,  # 'get', 'set', or 'method'
-                "static": node.static,
-                "computed": node.computed,
-                "is_async": getattr(node.value, "async", False),
-                "is_generator": getattr(node.value, "generator", False)
+                "kind": kind,  # 'constructor', 'get', 'set', or 'method'
+                "static": JavaScriptParser._has_token(node, 'static'),
+                "computed": name_node is not None and name_node.type == 'computed_property_name',
+                "is_async": JavaScriptParser._has_token(node, 'async'),
+                "is_generator": JavaScriptParser._has_token(node, '*')
             }
         )
     
     @staticmethod
-    def _process_import(node, source: str, file_path: str) -> ASTNode:
+    def _process_import(node: Node, source: Source, file_path: str) -> ASTNode:
         """Process an import declaration node"""
         specifiers = []
-        for spec in node.specifiers:
-            if spec.type == 'ImportDefaultSpecifier':
-                specifiers.append(f"default as {spec.local.name}")
-            elif spec.type == 'ImportNamespaceSpecifier':
-                specifiers.append(f"* as {spec.local.name}")
-            else:
-                imported = spec.imported.name if hasattr(spec.imported, 'name') else spec.imported.value
-                specifiers.append(f"{imported} as {spec.local.name}" if spec.local.name != imported else imported)
+        clause = next((child for child in node.named_children if child.type == 'import_clause'), None)
+        for spec in clause.named_children if clause else []:
+            if spec.type == 'identifier':
+                specifiers.append(f"default as {JavaScriptParser._text(spec, source)}")
+            elif spec.type == 'namespace_import':
+                local = next((child for child in spec.named_children if child.type == 'identifier'), None)
+                specifiers.append(f"* as {JavaScriptParser._text(local, source)}")
+            elif spec.type == 'named_imports':
+                for named in spec.named_children:
+                    if named.type != 'import_specifier':
+                        continue
+                    imported = JavaScriptParser._text(named.child_by_field_name('name'), source)
+                    local = JavaScriptParser._text(named.child_by_field_name('alias'), source) or imported
+                    specifiers.append(f"{imported} as {local}" if local != imported else imported)
+        
+        source_node = node.child_by_field_name('source')
+        module = JavaScriptParser._text(source_node, source)[1:-1] if source_node else None
         
         return ASTNode(
             type=NodeType.IMPORT,
-            name=f"from {node.source.value} import {', '.join(specifiers)}",
+            name=f"from {module} import {', '.join(specifiers)}",
             position=JavaScriptParser._get_node_position(node),
             properties={
-                "source": node.source.value,
+                "source": module,
                 "specifiers": specifiers
             }
-        ) 
\ No newline at end of file
+        )
\ No newline at end of file
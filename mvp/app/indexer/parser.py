@@ -1,9 +1,12 @@
+import logging
 import ast
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from pathlib import Path
 
 from ..database.models import ASTNode, NodeType, Position
 
+logger = logging.getLogger(__name__)
+
 class PythonParser:
     """Parser for Python source code that generates an AST representation"""
     
@@ -11,13 +14,18 @@ class PythonParser:
     def parse_file(file_path: Path) -> Optional[ASTNode]:
         """Parse a Python file and return its AST representation"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # ast.parse decodes bytes itself (honouring coding declarations), so no str copy is made here
+            with open(file_path, 'rb') as f:
                 source = f.read()
             
             tree = ast.parse(source)
-            return PythonParser._process_node(tree, source, str(file_path))
+            root = PythonParser._process_node(tree, str(file_path))
+            if root is not None:
+                # The module spans the whole file; counting newlines avoids splitting it into lines
+                root.position.end_line = source.count(b"\n") + (1 if source and not source.endswith(b"\n") else 0)
+            return root
         except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
+            logger.warning("Error parsing %s: %s", file_path, e)
             return None
     
     @staticmethod
@@ -31,51 +39,56 @@ class PythonParser:
         )
     
     @staticmethod
-    def _process_node(node: ast.AST, source: str, file_path: str) -> Optional[ASTNode]:
-        """Process an AST node and its children recursively"""
+    def _process_node(node: ast.AST, file_path: str) -> Optional[ASTNode]:
+        """Process an AST node and its children with an explicit stack"""
+        root = PythonParser._process_single(node, None, file_path)
+        if root is None:
+            return None
+        
+        stack: List[Tuple[ast.AST, ASTNode]] = [(node, root)]
+        while stack:
+            parent, processed_parent = stack.pop()
+            for child in PythonParser._child_nodes(parent):
+                if processed := PythonParser._process_single(child, parent, file_path):
+                    processed_parent.children.append(processed)
+                    stack.append((child, processed))
+        return root
+    
+    @staticmethod
+    def _child_nodes(node: ast.AST) -> Sequence[ast.AST]:
+        """Statements whose definitions become children of a processed node"""
         if isinstance(node, ast.Module):
-            return PythonParser._process_module(node, source, file_path)
+            return list(ast.iter_child_nodes(node))
         elif isinstance(node, ast.ClassDef):
-            return PythonParser._process_class(node, source, file_path)
-        elif isinstance(node, ast.FunctionDef):
-            return PythonParser._process_function(node, source, file_path)
-        elif isinstance(node, ast.Import):
-            return PythonParser._process_import(node, source, file_path)
-        elif isinstance(node, ast.ImportFrom):
-            return PythonParser._process_import_from(node, source, file_path)
-        return None
+            return node.body
+        return []
     
     @staticmethod
-    def _process_module(node: ast.Module, source: str, file_path: str) -> ASTNode:
+    def _process_single(node: ast.AST, parent: Optional[ast.AST], file_path: str) -> Optional[ASTNode]:
+        """Process one AST node, without its children"""
+        handler = _NODE_HANDLERS.get(type(node))
+        return handler(node, parent, file_path) if handler else None
+    
+    @staticmethod
+    def _process_module(node: ast.Module, parent: Optional[ast.AST], file_path: str) -> ASTNode:
         """Process a module node"""
-        children = []
-        for child in ast.iter_child_nodes(node):
-            if processed := PythonParser._process_node(child, source, file_path):
-                children.append(processed)
-        
         return ASTNode(
             type=NodeType.MODULE,
             name=Path(file_path).name,
-            position=Position(start_line=1, end_line=len(source.splitlines())),
-            children=children,
+            # parse_file replaces this with the file's line count
+            position=Position(start_line=1, end_line=(node.body[-1].end_lineno or 1) if node.body else 1),
             properties={"file_path": file_path}
         )
     
     @staticmethod
-    def _process_class(node: ast.ClassDef, source: str, file_path: str) -> ASTNode:
+    def _process_class(node: ast.ClassDef, parent: Optional[ast.AST], file_path: str) -> ASTNode:
         """Process a class definition node"""
-        children = []
-        for child in node.body:
-            if processed := PythonParser._process_node(child, source, file_path):
-                children.append(processed)
-        
         bases = [base.id for base in node.bases if isinstance(base, ast.Name)]
         
         return ASTNode(
             type=NodeType.CLASS,
             name=node.name,
             position=PythonParser._get_node_position(node),
-            children=children,
             properties={
                 "bases": bases,
                 "decorators": [d.id for d in node.decorator_list if isinstance(d, ast.Name)]
@@ -83,10 +96,10 @@ class PythonParser:
         )
     
     @staticmethod
-    def _process_function(node: ast.FunctionDef, source: str, file_path: str) -> ASTNode:
+    def _process_function(node: ast.FunctionDef, parent: Optional[ast.AST], file_path: str) -> ASTNode:
         """Process a function definition node"""
         # Determine if this is a method (inside a class) or standalone function
-        node_type = NodeType.METHOD if isinstance(node.parent, ast.ClassDef) else NodeType.FUNCTION
+        node_type = NodeType.METHOD if isinstance(parent, ast.ClassDef) else NodeType.FUNCTION
         
         return ASTNode(
             type=node_type,
@@ -100,7 +113,7 @@ class PythonParser:
         )
     
     @staticmethod
-    def _process_import(node: ast.Import, source: str, file_path: str) -> ASTNode:
+    def _process_import(node: ast.Import, parent: Optional[ast.AST], file_path: str) -> ASTNode:
         """Process an import node"""
         return ASTNode(
             type=NodeType.IMPORT,
@@ -114,7 +127,7 @@ class PythonParser:
         )
     
     @staticmethod
-    def _process_import_from(node: ast.ImportFrom, source: str, file_path: str) -> ASTNode:
+    def _process_import_from(node: ast.ImportFrom, parent: Optional[ast.AST], file_path: str) -> ASTNode:
         """Process an import from node"""
         return ASTNode(
             type=NodeType.IMPORT,
@@ -127,4 +140,13 @@ class PythonParser:
                     alias.name: alias.asname for alias in node.names if alias.asname
                 }
             }
-        ) 
\ No newline at end of file
+        ) 
+
+# Node processors keyed by exact AST type: one dict lookup per visited node replaces an isinstance chain
+_NODE_HANDLERS: Dict[type, Callable[[Any, Optional[ast.AST], str], ASTNode]] = {
+    ast.Module: PythonParser._process_module,
+    ast.ClassDef: PythonParser._process_class,
+    ast.FunctionDef: PythonParser._process_function,
+    ast.Import: PythonParser._process_import,
+    ast.ImportFrom: PythonParser._process_import_from,
+}
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from typing import Dict, Optional, List, Set
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,6 +8,8 @@ from .config import settings
 from .database.neo4j_client import db_client
 from .indexer.indexer import indexer
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="MCP Code Indexer",
     description="A tool for indexing and analyzing codebases using AST and graph databases",
@@ -45,7 +48,7 @@ async def startup():
     try:
         db_client.connect()
     except Exception as e:
-        print(f"Error connecting to Neo4j: {e}")
+        logger.error("Error connecting to Neo4j: %s", e)
         raise
 
 @app.on_event("shutdown")
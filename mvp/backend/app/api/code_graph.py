@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Query, Body, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
-from ..services.neo4j_service import neo4j_service, NEO4J_URI
+from ..services.neo4j_service import get_neo4j_service
 
 router = APIRouter()
 
 @router.get("/code-graph")
 async def get_code_graph(repo_path: str = Query(..., description="Path to the repository")):
     """Get the code graph for the specified repository."""
+    neo4j_service = await get_neo4j_service()
     if not neo4j_service.connected:
-        if not neo4j_service.reconnect():
+        if not await neo4j_service.ensure_connected():
             raise HTTPException(status_code=503, detail="Neo4j database is not connected")
     
-    graph_data = neo4j_service.get_code_graph(repo_path)
-    
-    return graph_data
+    # Streamed as the nodes and links are encoded, rather than building the whole
+    # graph as dictionaries first
+    graph_chunks = await neo4j_service.stream_code_graph(repo_path)
+    return StreamingResponse(graph_chunks, media_type="application/json")
 
 @router.post("/neo4j-query")
 async def execute_neo4j_query(
@@ -21,11 +24,12 @@ async def execute_neo4j_query(
     params: Optional[Dict[str, Any]] = Body({}, embed=True, description="Query parameters")
 ):
     """Execute a custom Cypher query against the Neo4j database."""
+    neo4j_service = await get_neo4j_service()
     if not neo4j_service.connected:
-        if not neo4j_service.reconnect():
+        if not await neo4j_service.ensure_connected():
             raise HTTPException(status_code=503, detail="Neo4j database is not connected")
     
-    result = neo4j_service.execute_query(query, params)
+    result = await neo4j_service.execute_query(query, params)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -35,9 +39,10 @@ async def execute_neo4j_query(
 @router.get("/neo4j-status")
 async def get_neo4j_status():
     """Get the current status of the Neo4j connection."""
+    neo4j_service = await get_neo4j_service()
     status = {
         "connected": neo4j_service.connected,
-        "uri": NEO4J_URI,
+        "uri": neo4j_service.uri,
         "auto_start_docker": neo4j_service.auto_start_docker
     }
     
@@ -1,92 +1,94 @@
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional, Tuple
 import os
-import ast
-from pathlib import Path
+import asyncio
+from collections import OrderedDict
+from ..services.code_parser import SymbolColumns, parse_python_file
+from ..services.parse_pool import get_parse_pool
 
 router = APIRouter()
 
-class CodeVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.classes = []
-        self.functions = []
-        self.imports = []
+# Directories whose subtrees are never walked
+SKIP_DIRS = frozenset({'.git', 'node_modules'})
 
-    def visit_ClassDef(self, node):
-        self.classes.append({
-            'name': node.name,
-            'lineno': node.lineno,
-            'end_lineno': node.end_lineno or node.lineno
-        })
-        self.generic_visit(node)
+# Parsed structures keyed by (path, mtime_ns, size), least recently used first;
+# an edited file gets a new key, so stale entries just age out
+PARSE_CACHE_SIZE = 10000
+_parse_cache: "OrderedDict[Tuple[str, int, int], Dict[str, SymbolColumns]]" = OrderedDict()
 
-    def visit_FunctionDef(self, node):
-        self.functions.append({
-            'name': node.name,
-            'lineno': node.lineno,
-            'end_lineno': node.end_lineno or node.lineno
-        })
-        self.generic_visit(node)
+def _get_cached_structure(key: Tuple[str, int, int]) -> Optional[Dict[str, SymbolColumns]]:
+    structure = _parse_cache.get(key)
+    if structure is not None:
+        _parse_cache.move_to_end(key)
+    return structure
 
-    def visit_Import(self, node):
-        for name in node.names:
-            self.imports.append({
-                'name': name.name,
-                'lineno': node.lineno
-            })
+def _cache_structure(key: Tuple[str, int, int], structure: Dict[str, SymbolColumns]) -> None:
+    _parse_cache[key] = structure
+    if len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
 
-    def visit_ImportFrom(self, node):
-        module = node.module or ''
-        for name in node.names:
-            import_name = f"{module}.{name.name}" if module else name.name
-            self.imports.append({
-                'name': import_name,
-                'lineno': node.lineno
-            })
-
-def parse_python_file(file_path: str) -> Dict[str, Any]:
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            tree = ast.parse(f.read(), filename=file_path)
-        
-        visitor = CodeVisitor()
-        visitor.visit(tree)
+def collect_python_files(path: str) -> List[Tuple[Tuple[str, int, int], str]]:
+    """List a repository's Python files as ((path, mtime_ns, size), relative path) pairs."""
+    # Directories are walked with scandir, pruning skipped subtrees
+    # instead of filtering every path beneath them
+    py_files = []
+    stack = [(path, '')]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
         
-        return {
-            'classes': visitor.classes,
-            'functions': visitor.functions,
-            'imports': visitor.imports
-        }
-    except Exception as e:
-        print(f"Error parsing {file_path}: {str(e)}")
-        return {
-            'classes': [],
-            'functions': [],
-            'imports': []
-        }
+        subdirs = []
+        for entry in entries:
+            rel_path = rel_dir + entry.name
+            try:
+                if entry.is_dir():
+                    # Like os.walk, symlinked directories are not followed
+                    if entry.name not in SKIP_DIRS and not entry.is_symlink():
+                        subdirs.append((entry.path, rel_path + os.sep))
+                elif entry.name.endswith('.py'):  # For now, only handle Python files
+                    stat = entry.stat()
+                    py_files.append(((entry.path, stat.st_mtime_ns, stat.st_size), rel_path))
+            except OSError:
+                continue
+        # Reversed so subdirectories are walked in listing order, as os.walk does
+        stack.extend(reversed(subdirs))
+    return py_files
 
 @router.get("/code-structure")
 async def get_code_structure(path: str) -> Dict[str, List[Dict[str, Any]]]:
-    if not os.path.exists(path):
+    # Disk access runs on the threadpool so the walk doesn't block the event loop
+    if not await run_in_threadpool(os.path.exists, path):
         raise HTTPException(status_code=404, detail="Repository path not found")
 
-    files = []
-    repo_path = Path(path)
+    py_files = await run_in_threadpool(collect_python_files, path)
 
-    for root, _, filenames in os.walk(repo_path):
-        root_path = Path(root)
-        if '.git' in root_path.parts or 'node_modules' in root_path.parts:
-            continue
+    # Unchanged files are served from the cache; only the rest are parsed
+    structures = [_get_cached_structure(key) for key, _ in py_files]
+    misses = [index for index, structure in enumerate(structures) if structure is None]
+
+    loop = asyncio.get_running_loop()
+    parse_pool = get_parse_pool()
+    parsed = await asyncio.gather(*[
+        loop.run_in_executor(parse_pool, parse_python_file, py_files[index][0][0])
+        for index in misses
+    ])
+    for index, structure in zip(misses, parsed):
+        # Names arrive from the workers as fresh strings; interned, the many names
+        # repeated across files (__init__, os.path, ...) share one object in the cache
+        for columns in structure.values():
+            columns.intern_names()
+        structures[index] = structure
+        _cache_structure(py_files[index][0], structure)
 
-        for filename in filenames:
-            if filename.endswith('.py'):  # For now, only handle Python files
-                file_path = root_path / filename
-                relative_path = str(file_path.relative_to(repo_path))
-                
-                structure = parse_python_file(str(file_path))
-                files.append({
-                    'path': relative_path,
-                    'structure': structure
-                })
+    # Structures are kept (and cached) as columns; they become dicts only for the response
+    files = [
+        {'path': relative_path, 'structure': {kind: columns.to_dicts() for kind, columns in structure.items()}}
+        for (_, relative_path), structure in zip(py_files, structures)
+    ]
 
-    return {'files': files} 
\ No newline at end of file
+    return {'files': files}
\ No newline at end of file
@@ -1,47 +1,62 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 import os
+import stat
 from typing import Optional
 from pathlib import Path
 
 router = APIRouter()
 
+# Bytes checked for a NUL when deciding whether a file is binary
+BINARY_CHECK_BYTES = 8192
+
 def is_binary(file_path: str) -> bool:
-    """Check if a file is binary."""
+    """Check if a file is binary (has a NUL byte near its start)."""
+    fd = os.open(file_path, os.O_RDONLY)
     try:
-        with open(file_path, 'tr') as check_file:
-            check_file.read(1024)
-            return False
-    except UnicodeDecodeError:
-        return True
+        chunk = os.read(fd, BINARY_CHECK_BYTES)
+    finally:
+        os.close(fd)
+    return b'\x00' in chunk
 
 def get_file_extension(file_path: str) -> Optional[str]:
     """Get the file extension without the dot."""
     return Path(file_path).suffix.lstrip('.')
 
-@router.get("/file-content")
-async def get_file_content(path: str):
-    """Get the content of a file."""
-    if not os.path.exists(path):
+def check_text_file(path: str) -> os.stat_result:
+    """Check that a path is a readable text file, returning its stat; raises HTTPException otherwise."""
+    try:
+        file_stat = os.stat(path)
+    except ValueError:  # Paths with NUL bytes can't be passed to the OS
+        raise HTTPException(status_code=400, detail="Invalid path")
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found")
     
-    if not os.path.isfile(path):
+    if not stat.S_ISREG(file_stat.st_mode):
         raise HTTPException(status_code=400, detail="Path is not a file")
     
     try:
-        # Check if file is binary
-        if is_binary(path):
-            raise HTTPException(status_code=400, detail="Cannot display binary file")
-        
-        # Get file extension
-        extension = get_file_extension(path)
-        
-        # Read file content
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        return {
-            "content": content,
-            "extension": extension
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        binary = is_binary(path)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if binary:
+        raise HTTPException(status_code=400, detail="Cannot display binary file")
+    return file_stat
+
+@router.get("/file-content")
+async def get_file_content(path: str):
+    """Get the content of a file, streamed from disk as text with its extension in X-Extension."""
+    # Disk checks run on the threadpool so a slow filesystem doesn't block the event loop
+    file_stat = await run_in_threadpool(check_text_file, path)
+    
+    # FileResponse sends the file in chunks (sendfile where the server supports it)
+    # with a Content-Length, instead of decoding it into a JSON string; passing the
+    # stat spares it another one
+    return FileResponse(
+        path,
+        stat_result=file_stat,
+        media_type='text/plain; charset=utf-8',
+        headers={'X-Extension': get_file_extension(path)}
+    )
\ No newline at end of file
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import os
+import stat
 from typing import List, Optional
 from pydantic import BaseModel
 import logging
@@ -15,8 +17,15 @@ class FileNode(BaseModel):
 
 FileNode.model_rebuild()
 
+# Directories left out of the tree, along with hidden entries
+EXCLUDED_DIRS = frozenset({'node_modules', '__pycache__', 'venv', 'env'})
+
+def _child_path(parent_rel: str, name: str) -> str:
+    """Relative path of an entry, given its parent's relative path"""
+    return name if parent_rel == '.' else parent_rel + os.sep + name
+
 def build_file_tree(path: str, base_path: str) -> FileNode:
-    """Recursively build a file tree structure."""
+    """Build a file tree structure, walking directories with an explicit stack."""
     name = os.path.basename(path)
     relative_path = os.path.relpath(path, base_path)
     
@@ -27,38 +36,66 @@ def build_file_tree(path: str, base_path: str) -> FileNode:
             type='file'
         )
     
-    children = []
-    try:
-        for item in sorted(os.listdir(path)):
-            item_path = os.path.join(path, item)
+    # Walk top-down, recording each directory's children as (relative path, name, is_file);
+    # nodes are then built bottom-up so every directory gets its finished children
+    directories = []
+    stack = [(path, relative_path, name, True)]
+    while stack:
+        dir_path, dir_rel, dir_name, traverse = stack.pop()
+        children = []
+        directories.append((dir_rel, dir_name, children))
+        if not traverse:
+            continue
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except PermissionError:
+            # Handle permission errors gracefully
+            continue
+        except Exception as e:
+            logger.error(f"Error processing path {dir_path}: {str(e)}")
+            # Return a partial tree in case of other errors
+            continue
+        
+        for entry in entries:
             # Skip hidden files and common exclude directories
-            if item.startswith('.') or item in {'node_modules', '__pycache__', 'venv', 'env'}:
+            if entry.name.startswith('.') or entry.name in EXCLUDED_DIRS:
                 continue
-            children.append(build_file_tree(item_path, base_path))
-    except PermissionError:
-        # Handle permission errors gracefully
-        return FileNode(
-            id=relative_path,
-            name=name,
-            type='directory',
-            children=[]
-        )
-    except Exception as e:
-        logger.error(f"Error processing path {path}: {str(e)}")
-        # Return a partial tree in case of other errors
-        return FileNode(
-            id=relative_path,
-            name=name,
+            child_rel = _child_path(dir_rel, entry.name)
+            # DirEntry caches its type, so this costs no extra stat() for most entries
+            is_file = entry.is_file()
+            children.append((child_rel, entry.name, is_file))
+            if not is_file:
+                # Symlinked directories are listed but not followed, so links can't cycle
+                stack.append((entry.path, child_rel, entry.name, not entry.is_symlink()))
+    
+    built = {}
+    for dir_rel, dir_name, children in reversed(directories):
+        built[dir_rel] = FileNode(
+            id=dir_rel,
+            name=dir_name,
             type='directory',
-            children=[]
+            children=[
+                FileNode(id=child_rel, name=child_name, type='file') if is_file else built.pop(child_rel)
+                for child_rel, child_name, is_file in children
+            ]
         )
     
-    return FileNode(
-        id=relative_path,
-        name=name,
-        type='directory',
-        children=children
-    )
+    return built[relative_path]
+
+def check_directory(path: str) -> None:
+    """Check with a single stat that a path is an existing directory, raising HTTPException otherwise."""
+    try:
+        is_dir = stat.S_ISDIR(os.stat(path).st_mode)
+    except ValueError:  # Paths with NUL bytes can't be passed to the OS
+        raise HTTPException(status_code=400, detail="Invalid path")
+    except OSError:
+        logger.error(f"Repository path not found: {path}")
+        raise HTTPException(status_code=404, detail=f"Repository path not found: {path}")
+    
+    if not is_dir:
+        logger.error(f"Path is not a directory: {path}")
+        raise HTTPException(status_code=400, detail="Path must be a directory")
 
 @router.get("/file-tree")
 async def get_file_tree(path: str):
@@ -68,17 +105,12 @@ async def get_file_tree(path: str):
     
     logger.info(f"Request to get file tree for path: {normalized_path}")
     
-    if not os.path.exists(normalized_path):
-        logger.error(f"Repository path not found: {normalized_path}")
-        raise HTTPException(status_code=404, detail=f"Repository path not found: {normalized_path}")
-    
-    if not os.path.isdir(normalized_path):
-        logger.error(f"Path is not a directory: {normalized_path}")
-        raise HTTPException(status_code=400, detail="Path must be a directory")
+    # Disk access runs on the threadpool, so other requests proceed while a large tree is walked
+    await run_in_threadpool(check_directory, normalized_path)
     
     try:
-        tree = build_file_tree(normalized_path, normalized_path)
+        tree = await run_in_threadpool(build_file_tree, normalized_path, normalized_path)
         return tree
     except Exception as e:
         logger.error(f"Error building file tree: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
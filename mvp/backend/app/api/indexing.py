@@ -3,9 +3,10 @@ from fastapi.responses import StreamingResponse
 from typing import Optional, Dict, Any
 from enum import Enum
 import asyncio
-import json
+import orjson
 from ..services.indexer import (
     get_indexing_status, 
+    get_status_event,
     get_file_history, 
     add_documentation, 
     start_indexing,
@@ -16,6 +17,11 @@ from ..services.indexer import (
 
 router = APIRouter()
 
+# Seconds between status events while nothing changes, which keeps proxies from closing the stream
+STATUS_HEARTBEAT_SECONDS = 5
+# Minimum seconds between status events; per-file updates within it are sent as one
+STATUS_MIN_INTERVAL_SECONDS = 0.25
+
 class ScheduleType(str, Enum):
     hourly = "hourly"
     daily = "daily"
@@ -32,15 +38,23 @@ class DayOfWeek(str, Enum):
     sunday = "sunday"
 
 async def generate_status_events(repo_path: str):
-    """Generate SSE events for indexing status."""
+    """Generate SSE events for indexing status as it changes."""
     while True:
+        # Taken before reading the status, so a change made after the read still wakes us
+        changed = get_status_event(repo_path)
         status = await get_indexing_status(repo_path)
-        yield f"data: {json.dumps(status)}\n\n"
+        # orjson encodes straight to bytes, which StreamingResponse sends as-is
+        yield b"data: " + orjson.dumps(status) + b"\n\n"
         
         if status["completed"]:
             break
-            
-        await asyncio.sleep(1)
+        
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=STATUS_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            # Nothing changed; the status is resent as a heartbeat
+            pass
+        await asyncio.sleep(STATUS_MIN_INTERVAL_SECONDS)
 
 @router.get("/indexing-status")
 async def indexing_status(repo_path: str = Query(..., description="Path to the repository")):
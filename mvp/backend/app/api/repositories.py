@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Query, HTTPException, Body
-from typing import Optional, List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel
 import os
-import json
+import orjson
+import threading
 from datetime import datetime
-from ..services.neo4j_service import neo4j_service
+from ..services.neo4j_service import get_neo4j_service
 from ..services.indexer import file_history
 
 router = APIRouter()
@@ -28,31 +30,105 @@ class Repository(BaseModel):
     link_count: int = 0
     snapshots: int = 0
 
+# Last parse of the config file, with the (mtime_ns, size) it was read at
+_repo_cache: Optional[Tuple[Tuple[int, int], List[Dict[str, Any]]]] = None
+
+# Serializes read-modify-write updates of the config file, which run on the threadpool
+_repo_lock = threading.Lock()
+
+# Snapshot count per snapshots directory, with the directory's mtime_ns when counted
+_snapshot_counts: Dict[str, Tuple[int, int]] = {}
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Get a file's (mtime_ns, size), which changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
 def load_repositories() -> List[Dict[str, Any]]:
-    """Load repositories from config file."""
+    """Load repositories from config file, reusing the last parse while the file is unchanged."""
+    global _repo_cache
     if not os.path.exists(REPO_CONFIG_PATH):
         return []
     
     try:
-        with open(REPO_CONFIG_PATH, 'r') as f:
-            return json.load(f)
+        signature = _file_signature(REPO_CONFIG_PATH)
+        if _repo_cache is None or _repo_cache[0] != signature:
+            with open(REPO_CONFIG_PATH, 'rb') as f:
+                _repo_cache = (signature, orjson.loads(f.read()))
     except Exception as e:
         print(f"Error loading repositories: {e}")
         return []
+    
+    # Callers modify the list and its entries, so each call gets its own copies
+    return [dict(repo) for repo in _repo_cache[1]]
 
 def save_repositories(repositories: List[Dict[str, Any]]):
     """Save repositories to config file."""
+    global _repo_cache
     try:
-        with open(REPO_CONFIG_PATH, 'w') as f:
-            json.dump(repositories, f, indent=2)
+        with open(REPO_CONFIG_PATH, 'wb') as f:
+            f.write(orjson.dumps(repositories, option=orjson.OPT_INDENT_2))
+        _repo_cache = (_file_signature(REPO_CONFIG_PATH), [dict(repo) for repo in repositories])
     except Exception as e:
         print(f"Error saving repositories: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save repository information: {str(e)}")
 
+def insert_repository(new_repo: Dict[str, Any]):
+    """Add a repository to the config file, unless its path is already there."""
+    with _repo_lock:
+        repositories = load_repositories()
+        for existing in repositories:
+            if existing["repo_path"] == new_repo["repo_path"]:
+                raise HTTPException(status_code=400, detail=f"Repository already indexed: {new_repo['repo_path']}")
+        
+        repositories.append(new_repo)
+        save_repositories(repositories)
+
+def remove_repository(repo_path: str):
+    """Remove a repository from the config file."""
+    with _repo_lock:
+        repositories = load_repositories()
+        remaining = [repo for repo in repositories if repo["repo_path"] != repo_path]
+        if len(remaining) == len(repositories):
+            raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
+        
+        save_repositories(remaining)
+
+def count_snapshots(repo_paths: List[str]) -> Dict[str, int]:
+    """Count each repository's snapshots, listing a snapshots directory again only once it changes."""
+    counts = {}
+    for repo_path in repo_paths:
+        snapshots_dir = os.path.join(os.path.dirname(REPO_CONFIG_PATH), 'snapshots', repo_path.replace('/', '_'))
+        try:
+            mtime_ns = os.stat(snapshots_dir).st_mtime_ns
+            cached = _snapshot_counts.get(snapshots_dir)
+            if cached is None or cached[0] != mtime_ns:
+                with os.scandir(snapshots_dir) as entries:
+                    # Compressed snapshots, and plain JSON ones saved before compression
+                    cached = (mtime_ns, sum(1 for entry in entries if entry.name.endswith(('.json.zst', '.json'))))
+                _snapshot_counts[snapshots_dir] = cached
+            counts[repo_path] = cached[1]
+        except OSError:
+            counts[repo_path] = 0
+    return counts
+
 @router.get("/repositories")
 async def get_repositories():
     """Get all indexed repositories."""
-    repositories = load_repositories()
+    # File access runs on the threadpool so it doesn't block the event loop
+    repositories = await run_in_threadpool(load_repositories)
+    repo_paths = [repo["repo_path"] for repo in repositories]
+    
+    # Get node and link counts from Neo4j for all repositories in one query
+    graph_counts = {}
+    neo4j_service = await get_neo4j_service()
+    if neo4j_service.connected:
+        try:
+            graph_counts = await neo4j_service.get_graph_counts(repo_paths)
+        except Exception as e:
+            print(f"Error getting graph data: {e}")
+    
+    snapshot_counts = await run_in_threadpool(count_snapshots, repo_paths)
     
     # Get additional metadata for each repository
     for repo in repositories:
@@ -64,40 +140,21 @@ async def get_repositories():
             files = file_history[repo["repo_path"]].get("files", {})
             repo["file_count"] = len(files)
         
-        # Get node and link count from Neo4j
-        if neo4j_service.connected:
-            try:
-                graph_data = neo4j_service.get_code_graph(repo["repo_path"])
-                repo["node_count"] = len(graph_data.get("nodes", []))
-                repo["link_count"] = len(graph_data.get("links", []))
-            except Exception as e:
-                print(f"Error getting graph data: {e}")
+        if repo["repo_path"] in graph_counts:
+            repo["node_count"], repo["link_count"] = graph_counts[repo["repo_path"]]
         
-        # Get snapshot count (will implement later)
-        snapshots_dir = os.path.join(os.path.dirname(REPO_CONFIG_PATH), 'snapshots', repo["repo_path"].replace('/', '_'))
-        if os.path.exists(snapshots_dir):
-            snapshot_files = [f for f in os.listdir(snapshots_dir) if f.endswith('.json')]
-            repo["snapshots"] = len(snapshot_files)
-        else:
-            repo["snapshots"] = 0
+        repo["snapshots"] = snapshot_counts[repo["repo_path"]]
     
     return {"repositories": repositories}
 
 @router.post("/repositories")
 async def add_repository(repo: RepositoryCreate):
     """Add a new repository to the index."""
-    repositories = load_repositories()
-    
-    # Check if path exists
-    if not os.path.exists(repo.repo_path):
+    # Check if path exists, on the threadpool so a slow disk doesn't block the event loop
+    if not await run_in_threadpool(os.path.exists, repo.repo_path):
         raise HTTPException(status_code=400, detail=f"Path does not exist: {repo.repo_path}")
     
-    # Check if already exists
-    for existing in repositories:
-        if existing["repo_path"] == repo.repo_path:
-            raise HTTPException(status_code=400, detail=f"Repository already indexed: {repo.repo_path}")
-    
-    # Add new repository
+    # Add new repository, unless it already exists
     display_name = repo.display_name or os.path.basename(repo.repo_path)
     new_repo = {
         "repo_path": repo.repo_path,
@@ -105,27 +162,13 @@ async def add_repository(repo: RepositoryCreate):
         "added_date": datetime.now().isoformat()
     }
     
-    repositories.append(new_repo)
-    save_repositories(repositories)
+    await run_in_threadpool(insert_repository, new_repo)
     
     return {"success": True, "repository": new_repo}
 
 @router.delete("/repositories")
 async def delete_repository(repo_path: str = Query(..., description="Path to the repository")):
     """Remove a repository from the index."""
-    repositories = load_repositories()
-    
-    # Find and remove repository
-    found = False
-    for i, repo in enumerate(repositories):
-        if repo["repo_path"] == repo_path:
-            repositories.pop(i)
-            found = True
-            break
-    
-    if not found:
-        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_path}")
-    
-    save_repositories(repositories)
+    await run_in_threadpool(remove_repository, repo_path)
     
     return {"success": True} 
\ No newline at end of file
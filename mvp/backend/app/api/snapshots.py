@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Query, HTTPException
-from typing import Optional, List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response
+from typing import Optional, List, Dict, Any, Set, Tuple
 import os
-import json
+import orjson
+import threading
 import uuid
+import xxhash
+import zstandard
 from datetime import datetime
-from ..services.neo4j_service import neo4j_service
+from ..services.neo4j_service import get_neo4j_service
 from ..services.indexer import file_history
 
 router = APIRouter()
@@ -15,6 +20,32 @@ SNAPSHOTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__f
 # Ensure directory exists
 os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
 
+# Snapshots are stored as zstd-compressed JSON; those saved before that are plain JSON
+SNAPSHOT_SUFFIX = '.json.zst'
+LEGACY_SNAPSHOT_SUFFIX = '.json'
+
+# Graph data is highly repetitive JSON, so even zstd's fast default level shrinks it several times
+SNAPSHOT_COMPRESSION_LEVEL = 3
+
+# Graph data blobs, compressed like snapshots and named by the hash of their JSON, so
+# snapshots of an unchanged graph share one blob; snapshots refer to theirs as {"$ref": <hash>}
+GRAPH_BLOBS_DIR = os.path.join(os.path.dirname(SNAPSHOTS_DIR), 'blobs')
+
+# IDs of the snapshots referring to each graph blob, by blob hash; built on first use
+# and kept current by save and delete. Both hold the lock while they change blobs and
+# snapshot files, so a blob isn't removed as a snapshot being saved comes to refer to it
+_graph_refs: Optional[Dict[str, Set[str]]] = None
+_graph_refs_lock = threading.Lock()
+
+# Snapshot file paths by snapshot ID, so lookups don't search every repository's
+# directory; filled on the first lookup and kept current by save and delete
+_snapshot_index: Dict[str, str] = {}
+_snapshot_index_lock = threading.Lock()
+
+# Snapshot lists by snapshots directory, with the directory's mtime_ns when listed;
+# saving or deleting a snapshot changes the mtime, and also drops the entry
+_snapshots_cache: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+
 def get_repo_snapshots_dir(repo_path: str) -> str:
     """Get the snapshots directory for a specific repository."""
     # Use sanitized path to create directory name
@@ -23,75 +54,266 @@ def get_repo_snapshots_dir(repo_path: str) -> str:
     os.makedirs(repo_dir, exist_ok=True)
     return repo_dir
 
+def get_snapshot_id(filename: str) -> Optional[str]:
+    """Get the ID of the snapshot stored in a file, or None if it isn't a snapshot file."""
+    for suffix in (SNAPSHOT_SUFFIX, LEGACY_SNAPSHOT_SUFFIX):
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return None
+
+def get_snapshot_meta_path(snapshot_path: str) -> str:
+    """Get the path of a snapshot's manifest: the snapshot without its graph_data."""
+    snapshots_dir, filename = os.path.split(snapshot_path)
+    return os.path.join(snapshots_dir, 'meta', f"{get_snapshot_id(filename)}.json")
+
+def read_json_file(path: str) -> bytes:
+    """Read a snapshot or graph blob file as JSON, decompressing it if it is compressed."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.zst'):
+        # Decompressors aren't thread-safe, so each read makes its own
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+def write_compressed_file(path: str, data: bytes):
+    """Write JSON to a file zstd-compressed."""
+    compressor = zstandard.ZstdCompressor(level=SNAPSHOT_COMPRESSION_LEVEL)
+    with open(path, 'wb') as f:
+        f.write(compressor.compress(data))
+
+def get_graph_blob_path(graph_hash: str) -> str:
+    """Get the path of the graph blob with a given hash."""
+    return os.path.join(GRAPH_BLOBS_DIR, f"{graph_hash}{SNAPSHOT_SUFFIX}")
+
+def get_graph_ref(snapshot: Dict[str, Any]) -> Optional[str]:
+    """Get the hash of the graph blob a stored snapshot refers to, or None if its graph_data is inline."""
+    graph_data = snapshot.get('graph_data')
+    if isinstance(graph_data, dict) and len(graph_data) == 1 and '$ref' in graph_data:
+        return graph_data['$ref']
+    return None
+
+def read_graph_ref(snapshot_path: str) -> Optional[str]:
+    """Get the hash of the graph blob a snapshot file refers to, or None if it has none or can't be read."""
+    # Only compressed snapshots were ever saved with a graph blob
+    if not snapshot_path.endswith(SNAPSHOT_SUFFIX):
+        return None
+    try:
+        return get_graph_ref(orjson.loads(read_json_file(snapshot_path)))
+    except (OSError, ValueError, zstandard.ZstdError):
+        return None
+
+def save_graph_blob(graph_json: bytes) -> str:
+    """Store graph data unless an identical graph is stored already, and return its hash."""
+    graph_hash = xxhash.xxh3_128_hexdigest(graph_json)
+    blob_path = get_graph_blob_path(graph_hash)
+    if not os.path.exists(blob_path):
+        os.makedirs(GRAPH_BLOBS_DIR, exist_ok=True)
+        # Written under a temporary name, so a blob that exists is always complete
+        temp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+        write_compressed_file(temp_path, graph_json)
+        os.replace(temp_path, blob_path)
+    return graph_hash
+
+def get_graph_refs() -> Dict[str, Set[str]]:
+    """Get the IDs of the snapshots referring to each graph blob; call with _graph_refs_lock held."""
+    global _graph_refs
+    if _graph_refs is None:
+        refs: Dict[str, Set[str]] = {}
+        for snapshot_id, snapshot_path in build_snapshot_index().items():
+            graph_hash = read_graph_ref(snapshot_path)
+            if graph_hash is not None:
+                refs.setdefault(graph_hash, set()).add(snapshot_id)
+        _graph_refs = refs
+    return _graph_refs
+
+def release_graph_blob(graph_hash: str, snapshot_id: str):
+    """Drop a deleted snapshot's reference to a graph blob, deleting the blob once none are left; call with _graph_refs_lock held."""
+    refs = get_graph_refs()
+    snapshot_ids = refs.get(graph_hash)
+    if snapshot_ids is not None:
+        snapshot_ids.discard(snapshot_id)
+        if snapshot_ids:
+            return
+        del refs[graph_hash]
+    try:
+        os.remove(get_graph_blob_path(graph_hash))
+    except FileNotFoundError:
+        pass
+
+def read_snapshot(snapshot_path: str) -> bytes:
+    """Read a snapshot as JSON, with its graph_data filled in from its graph blob."""
+    data = read_json_file(snapshot_path)
+    if not snapshot_path.endswith(SNAPSHOT_SUFFIX):
+        return data
+    
+    snapshot = orjson.loads(data)
+    graph_hash = get_graph_ref(snapshot)
+    if graph_hash is None:
+        return data
+    # The blob is JSON already, so it is embedded without being decoded and re-encoded
+    snapshot['graph_data'] = orjson.Fragment(read_json_file(get_graph_blob_path(graph_hash)))
+    return orjson.dumps(snapshot)
+
+def save_snapshot_meta(snapshot_path: str, snapshot: Dict[str, Any]):
+    """Write a snapshot's manifest."""
+    meta_path = get_snapshot_meta_path(snapshot_path)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    meta = {key: value for key, value in snapshot.items() if key != 'graph_data'}
+    with open(meta_path, 'wb') as f:
+        f.write(orjson.dumps(meta))
+
+def load_snapshot_meta(snapshot_path: str) -> Dict[str, Any]:
+    """Load a snapshot without its graph_data, from its manifest."""
+    try:
+        with open(get_snapshot_meta_path(snapshot_path), 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        pass
+    
+    # Saved before snapshots had manifests: read the snapshot this once
+    snapshot = orjson.loads(read_json_file(snapshot_path))
+    try:
+        save_snapshot_meta(snapshot_path, snapshot)
+    except OSError as e:
+        print(f"Error saving snapshot manifest: {e}")
+    snapshot.pop('graph_data', None)
+    return snapshot
+
 def load_snapshots(repo_path: str) -> List[Dict[str, Any]]:
-    """Load all snapshots for a repository."""
+    """Load all snapshots for a repository, reusing the last listing while none were added or removed."""
     snapshots_dir = get_repo_snapshots_dir(repo_path)
-    snapshots = []
+    try:
+        mtime_ns = os.stat(snapshots_dir).st_mtime_ns
+    except OSError:
+        return []
     
-    if os.path.exists(snapshots_dir):
-        for filename in os.listdir(snapshots_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(snapshots_dir, filename), 'r') as f:
-                        snapshot = json.load(f)
-                        # Exclude graph_data from the list to keep it lightweight
-                        if 'graph_data' in snapshot:
-                            del snapshot['graph_data']
-                        snapshots.append(snapshot)
-                except Exception as e:
-                    print(f"Error loading snapshot {filename}: {e}")
+    cached = _snapshots_cache.get(snapshots_dir)
+    if cached is not None and cached[0] == mtime_ns:
+        return list(cached[1])
+    
+    snapshots = []
+    for filename in os.listdir(snapshots_dir):
+        if get_snapshot_id(filename) is not None:
+            try:
+                # Manifests leave out graph_data, keeping the list lightweight
+                snapshots.append(load_snapshot_meta(os.path.join(snapshots_dir, filename)))
+            except Exception as e:
+                print(f"Error loading snapshot {filename}: {e}")
     
     # Sort by timestamp descending (newest first)
     snapshots.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    return snapshots
+    _snapshots_cache[snapshots_dir] = (mtime_ns, snapshots)
+    return list(snapshots)
+
+def build_snapshot_index() -> Dict[str, str]:
+    """Map the ID of every snapshot on disk to its file path."""
+    index = {}
+    with os.scandir(SNAPSHOTS_DIR) as repo_dirs:
+        for repo_dir in repo_dirs:
+            if repo_dir.is_dir():
+                with os.scandir(repo_dir.path) as entries:
+                    for entry in entries:
+                        snapshot_id = get_snapshot_id(entry.name)
+                        if snapshot_id is not None:
+                            index[snapshot_id] = entry.path
+    return index
+
+def find_snapshot_path(snapshot_id: str) -> Optional[str]:
+    """Get the file path of a snapshot by ID, or None if there is no such snapshot."""
+    with _snapshot_index_lock:
+        snapshot_path = _snapshot_index.get(snapshot_id)
+        if snapshot_path is None:
+            # Not indexed yet, or written by another process: rescan the directories
+            _snapshot_index.clear()
+            _snapshot_index.update(build_snapshot_index())
+            snapshot_path = _snapshot_index.get(snapshot_id)
+    return snapshot_path
 
 def get_snapshot(snapshot_id: str) -> Optional[Dict[str, Any]]:
     """Get a specific snapshot by ID."""
-    # Search in all repo directories since we don't know which repo it belongs to
-    for repo_dir in os.listdir(SNAPSHOTS_DIR):
-        repo_snapshots_dir = os.path.join(SNAPSHOTS_DIR, repo_dir)
-        if os.path.isdir(repo_snapshots_dir):
-            snapshot_path = os.path.join(repo_snapshots_dir, f"{snapshot_id}.json")
-            if os.path.exists(snapshot_path):
-                try:
-                    with open(snapshot_path, 'r') as f:
-                        return json.load(f)
-                except Exception as e:
-                    print(f"Error loading snapshot {snapshot_id}: {e}")
-                    return None
-    return None
+    snapshot_path = find_snapshot_path(snapshot_id)
+    if snapshot_path is None:
+        return None
+    
+    try:
+        return orjson.loads(read_snapshot(snapshot_path))
+    except Exception as e:
+        print(f"Error loading snapshot {snapshot_id}: {e}")
+        return None
 
 def save_snapshot(repo_path: str, snapshot: Dict[str, Any]):
     """Save a snapshot to disk."""
     snapshots_dir = get_repo_snapshots_dir(repo_path)
-    snapshot_path = os.path.join(snapshots_dir, f"{snapshot['id']}.json")
+    snapshot_path = os.path.join(snapshots_dir, f"{snapshot['id']}{SNAPSHOT_SUFFIX}")
     
+    # Snapshots are only read back by the API, so they are written compactly in one write
     try:
-        with open(snapshot_path, 'w') as f:
-            json.dump(snapshot, f, indent=2)
+        stored = dict(snapshot)
+        graph_json = orjson.dumps(snapshot['graph_data']) if snapshot.get('graph_data') is not None else None
+        with _graph_refs_lock:
+            graph_hash = None
+            if graph_json is not None:
+                graph_hash = save_graph_blob(graph_json)
+                stored['graph_data'] = {'$ref': graph_hash}
+            write_compressed_file(snapshot_path, orjson.dumps(stored))
+            if graph_hash is not None:
+                get_graph_refs().setdefault(graph_hash, set()).add(snapshot['id'])
+        # Written after the snapshot, so every manifest has a snapshot behind it
+        save_snapshot_meta(snapshot_path, snapshot)
     except Exception as e:
         print(f"Error saving snapshot: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save snapshot: {str(e)}")
+    
+    with _snapshot_index_lock:
+        _snapshot_index[snapshot['id']] = snapshot_path
+    _snapshots_cache.pop(snapshots_dir, None)
+
+def delete_snapshot_files(snapshot_id: str, snapshot_path: str):
+    """Delete a snapshot's file and manifest, and its graph blob once no other snapshot refers to it."""
+    with _graph_refs_lock:
+        # Read before the snapshot goes, to release its graph blob after
+        graph_hash = read_graph_ref(snapshot_path)
+        os.remove(snapshot_path)
+        if graph_hash is not None:
+            release_graph_blob(graph_hash, snapshot_id)
+    
+    with _snapshot_index_lock:
+        _snapshot_index.pop(snapshot_id, None)
+    _snapshots_cache.pop(os.path.dirname(snapshot_path), None)
+    
+    try:
+        os.remove(get_snapshot_meta_path(snapshot_path))
+    except FileNotFoundError:
+        pass
 
 @router.get("/snapshots")
 async def get_repository_snapshots(repo_path: str = Query(..., description="Path to the repository")):
     """Get all snapshots for a repository."""
-    snapshots = load_snapshots(repo_path)
-    return {"snapshots": snapshots}
+    # Listing may scan the directory and read manifests, so it runs on the threadpool
+    snapshots = await run_in_threadpool(load_snapshots, repo_path)
+    # Returned as a response so FastAPI doesn't walk the content with jsonable_encoder
+    return ORJSONResponse({"snapshots": snapshots})
 
 @router.get("/snapshot-details")
 async def get_snapshot_details(id: str = Query(..., description="Snapshot ID")):
     """Get details for a specific snapshot."""
-    snapshot = get_snapshot(id)
-    if not snapshot:
+    # A lookup miss rescans the snapshot directories, so it runs on the threadpool
+    snapshot_path = await run_in_threadpool(find_snapshot_path, id)
+    if snapshot_path is None:
         raise HTTPException(status_code=404, detail=f"Snapshot not found: {id}")
     
-    return snapshot
+    try:
+        content = await run_in_threadpool(read_snapshot, snapshot_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {id}")
+    
+    # The snapshot is stored as JSON, so it is sent as is rather than decoded and re-encoded
+    return Response(content, media_type="application/json")
 
 @router.post("/snapshots")
 async def create_snapshot(repo_path: str = Query(..., description="Path to the repository")):
     """Create a new snapshot of the current state."""
-    if not os.path.exists(repo_path):
+    if not await run_in_threadpool(os.path.exists, repo_path):
         raise HTTPException(status_code=400, detail=f"Repository does not exist: {repo_path}")
     
     # Get current file history for the repo
@@ -101,9 +323,10 @@ async def create_snapshot(repo_path: str = Query(..., description="Path to the r
     
     # Get current graph data
     graph_data = None
+    neo4j_service = await get_neo4j_service()
     if neo4j_service.connected:
         try:
-            graph_data = neo4j_service.get_code_graph(repo_path)
+            graph_data = await neo4j_service.get_code_graph(repo_path)
         except Exception as e:
             print(f"Error getting graph data: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to get graph data: {str(e)}")
@@ -135,34 +358,32 @@ async def create_snapshot(repo_path: str = Query(..., description="Path to the r
         "graph_data": graph_data
     }
     
-    # Save the snapshot
-    save_snapshot(repo_path, snapshot)
+    # Save the snapshot; compressing and writing it runs on the threadpool
+    await run_in_threadpool(save_snapshot, repo_path, snapshot)
     
     # Return the snapshot without the graph_data to keep response size small
     snapshot_response = snapshot.copy()
     if "graph_data" in snapshot_response:
         del snapshot_response["graph_data"]
     
-    return snapshot_response
+    return ORJSONResponse(snapshot_response)
 
 @router.delete("/snapshots")
 async def delete_snapshot(id: str = Query(..., description="Snapshot ID")):
     """Delete a specific snapshot."""
-    snapshot = get_snapshot(id)
-    if not snapshot:
+    # Find and delete the snapshot file
+    snapshot_path = await run_in_threadpool(find_snapshot_path, id)
+    if snapshot_path is None:
         raise HTTPException(status_code=404, detail=f"Snapshot not found: {id}")
     
-    # Find and delete the snapshot file
-    repo_path = snapshot.get("repo_path")
-    if repo_path:
-        snapshots_dir = get_repo_snapshots_dir(repo_path)
-        snapshot_path = os.path.join(snapshots_dir, f"{id}.json")
-        
-        if os.path.exists(snapshot_path):
-            try:
-                os.remove(snapshot_path)
-                return {"success": True}
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Failed to delete snapshot: {str(e)}")
+    try:
+        await run_in_threadpool(delete_snapshot_files, id, snapshot_path)
+    except FileNotFoundError:
+        # Deleted since it was indexed
+        with _snapshot_index_lock:
+            _snapshot_index.pop(id, None)
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {id}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete snapshot: {str(e)}")
     
-    raise HTTPException(status_code=500, detail="Failed to delete snapshot: could not determine file location") 
\ No newline at end of file
+    return {"success": True} 
\ No newline at end of file
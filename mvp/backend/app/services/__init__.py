@@ -1,3 +1,4 @@
 """Services for the Code Indexer application."""
 
-from . import indexer 
\ No newline at end of file
+# Submodules are imported where they are used; importing them here would make
+# parse worker processes, which import services.code_parser, connect to Neo4j
\ No newline at end of file
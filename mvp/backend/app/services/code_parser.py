@@ -0,0 +1,284 @@
+"""Extraction of classes, functions and imports from Python, JavaScript and TypeScript source.
+
+Kept free of FastAPI and the database services so parse worker processes,
+which import this module, start quickly.
+"""
+import ast
+import functools
+import os
+import sys
+from array import array
+from typing import List, Dict, Any, Optional
+from tree_sitter import Language, Node, Parser
+import tree_sitter_javascript
+import tree_sitter_python
+import tree_sitter_typescript
+
+# Tree-sitter parses in C without building Python objects for every node; only the
+# statements that can hold definitions are visited. Each worker process builds its own
+_parser = Parser(Language(tree_sitter_python.language()))
+
+# Statements and clauses whose bodies can contain class, def or import statements
+_CONTAINER_TYPES = frozenset({
+    'module', 'block', 'class_definition', 'function_definition', 'decorated_definition',
+    'if_statement', 'elif_clause', 'else_clause', 'for_statement', 'while_statement',
+    'try_statement', 'except_clause', 'except_group_clause', 'finally_clause',
+    'with_statement', 'match_statement', 'case_clause',
+})
+
+# Tree-sitter grammar per JavaScript/TypeScript extension; the JavaScript grammar also
+# covers JSX. Their parsers are built on first use
+_JS_LANGUAGES = {
+    '.js': tree_sitter_javascript.language,
+    '.jsx': tree_sitter_javascript.language,
+    '.ts': tree_sitter_typescript.language_typescript,
+    '.tsx': tree_sitter_typescript.language_tsx,
+}
+
+# JavaScript/TypeScript statements whose bodies can contain class, function or import statements
+_JS_CONTAINER_TYPES = frozenset({
+    'program', 'export_statement', 'class_declaration', 'abstract_class_declaration', 'class_body',
+    'function_declaration', 'generator_function_declaration', 'method_definition', 'statement_block',
+    'if_statement', 'else_clause', 'for_statement', 'for_in_statement', 'while_statement', 'do_statement',
+    'try_statement', 'catch_clause', 'finally_clause', 'switch_statement', 'switch_body', 'switch_case',
+    'switch_default', 'labeled_statement',
+})
+
+class SymbolColumns:
+    """Symbols of one kind as parallel name and line columns, rather than a dict per symbol."""
+    __slots__ = ('names', 'starts', 'ends')
+
+    def __init__(self, with_ends: bool = True):
+        self.names: List[str] = []
+        self.starts = array('i')
+        # Imports are recorded by start line only
+        self.ends = array('i') if with_ends else None
+
+    def append(self, name: str, start: int, end: Optional[int] = None) -> None:
+        self.names.append(name)
+        self.starts.append(start)
+        if self.ends is not None:
+            self.ends.append(end)
+
+    def intern_names(self) -> None:
+        """Intern the names, so a name recurring across files is stored once."""
+        self.names = [sys.intern(name) for name in self.names]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Expand to the API's list of symbol dicts."""
+        if self.ends is None:
+            return [{'name': name, 'lineno': start} for name, start in zip(self.names, self.starts)]
+        return [
+            {'name': name, 'lineno': start, 'end_lineno': end}
+            for name, start, end in zip(self.names, self.starts, self.ends)
+        ]
+
+def _empty_structure() -> Dict[str, SymbolColumns]:
+    return {
+        'classes': SymbolColumns(),
+        'functions': SymbolColumns(),
+        'imports': SymbolColumns(with_ends=False)
+    }
+
+# Fields holding the statement lists of compound statements, except handlers and match
+# cases, in ast's field order so definitions are found in the order a NodeVisitor finds them
+_STATEMENT_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+def _scan_ast(tree: ast.Module) -> Dict[str, SymbolColumns]:
+    """Collect classes, functions and imports by walking statement lists only, never expressions."""
+    structure = _empty_structure()
+    classes = structure['classes']
+    functions = structure['functions']
+    imports = structure['imports']
+    
+    stack: List[ast.AST] = list(reversed(tree.body))
+    while stack:
+        node = stack.pop()
+        node_type = type(node)
+        if node_type is ast.ClassDef:
+            classes.append(node.name, node.lineno, node.end_lineno or node.lineno)
+        elif node_type is ast.FunctionDef:
+            # Async functions are not recorded, though definitions nested in them are
+            functions.append(node.name, node.lineno, node.end_lineno or node.lineno)
+        elif node_type is ast.Import:
+            for name in node.names:
+                imports.append(name.name, node.lineno)
+            continue
+        elif node_type is ast.ImportFrom:
+            module = node.module or ''
+            for name in node.names:
+                imports.append(f"{module}.{name.name}" if module else name.name, node.lineno)
+            continue
+        
+        # Reversed so statements are visited in source order
+        for field in reversed(_STATEMENT_FIELDS):
+            statements = getattr(node, field, None)
+            if statements:
+                stack.extend(reversed(statements))
+    
+    return structure
+
+def _text(node: Node) -> str:
+    return node.text.decode('utf-8')
+
+def _dotted_name(node: Node) -> str:
+    """Name of a dotted_name node, normalized like ast (no whitespace around dots)."""
+    return '.'.join(_text(part) for part in node.named_children)
+
+def _end_line(node: Node) -> int:
+    """Last line of a statement as ast reports it, ignoring trailing comments in its blocks."""
+    while node.type in _CONTAINER_TYPES:
+        last = next((child for child in reversed(node.named_children) if child.type != 'comment'), None)
+        if last is None:
+            break
+        node = last
+    return node.end_point[0] + 1
+
+def _imported_names(node: Node) -> List[str]:
+    """Imported names of an import statement, as the ast visitor records them."""
+    names = []
+    for name in node.children_by_field_name('name'):
+        if name.type == 'aliased_import':
+            name = name.child_by_field_name('name')
+        names.append(_dotted_name(name))
+    if node.type == 'import_statement':
+        return names
+    
+    if node.type == 'future_import_statement':
+        module = '__future__'
+    else:
+        module_node = node.child_by_field_name('module_name')
+        if module_node.type == 'relative_import':
+            # Like ast's ImportFrom.module, the leading dots are not part of the module
+            module_node = next((child for child in module_node.named_children if child.type == 'dotted_name'), None)
+        module = _dotted_name(module_node) if module_node else ''
+        if any(child.type == 'wildcard_import' for child in node.named_children):
+            names.append('*')
+    return [f"{module}.{name}" if module else name for name in names]
+
+def _parse_with_tree_sitter(data: bytes) -> Optional[Dict[str, SymbolColumns]]:
+    """Collect classes, functions and imports with tree-sitter; None if the source has syntax errors."""
+    tree = _parser.parse(data)
+    if tree.root_node.has_error:
+        return None
+    
+    structure = _empty_structure()
+    classes = structure['classes']
+    functions = structure['functions']
+    imports = structure['imports']
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type == 'class_definition':
+            classes.append(_text(node.child_by_field_name('name')), node.start_point[0] + 1, _end_line(node))
+        elif node.type == 'function_definition' and node.children[0].type != 'async':
+            # Like the ast visitor, async functions are not recorded
+            functions.append(_text(node.child_by_field_name('name')), node.start_point[0] + 1, _end_line(node))
+        elif node.type in ('import_statement', 'import_from_statement', 'future_import_statement'):
+            lineno = node.start_point[0] + 1
+            for name in _imported_names(node):
+                imports.append(name, lineno)
+            continue
+        
+        if node.type in _CONTAINER_TYPES:
+            # Reversed so statements are visited in source order
+            stack.extend(reversed(node.named_children))
+    
+    return structure
+
+def _parse_python(data: bytes, file_path: str) -> Dict[str, SymbolColumns]:
+    structure = _parse_with_tree_sitter(data)
+    if structure is not None:
+        return structure
+    
+    # The grammar rejected the file: let ast decide, which either handles syntax
+    # tree-sitter doesn't know yet or reports the syntax error
+    return _scan_ast(ast.parse(data, filename=file_path))
+
+@functools.lru_cache(maxsize=None)
+def _get_js_parser(suffix: str) -> Parser:
+    """Get the tree-sitter parser for a JavaScript/TypeScript file extension."""
+    return Parser(Language(_JS_LANGUAGES[suffix]()))
+
+def _js_imported_names(node: Node) -> List[str]:
+    """Imported names of an import statement, as module.name like Python imports."""
+    source = node.child_by_field_name('source')
+    if source is None:
+        return []
+    module = _text(source)[1:-1]
+    
+    clause = next((child for child in node.named_children if child.type == 'import_clause'), None)
+    if clause is None:
+        # Imported for its side effects only
+        return [module]
+    names = []
+    for spec in clause.named_children:
+        if spec.type == 'identifier':
+            names.append(f"{module}.default")
+        elif spec.type == 'namespace_import':
+            names.append(f"{module}.*")
+        elif spec.type == 'named_imports':
+            for named in spec.named_children:
+                if named.type == 'import_specifier':
+                    names.append(f"{module}.{_text(named.child_by_field_name('name'))}")
+    return names
+
+def _parse_js_with_tree_sitter(data: bytes, suffix: str) -> Dict[str, SymbolColumns]:
+    """Collect classes, functions (and methods) and imports of a JavaScript/TypeScript file."""
+    tree = _get_js_parser(suffix).parse(data)
+    # Tree-sitter recovers from syntax errors; fail such files as ast would
+    if tree.root_node.has_error:
+        raise SyntaxError("source contains syntax errors")
+    
+    structure = _empty_structure()
+    classes = structure['classes']
+    functions = structure['functions']
+    imports = structure['imports']
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type in ('class_declaration', 'abstract_class_declaration'):
+            classes.append(_text(node.child_by_field_name('name')), node.start_point[0] + 1, node.end_point[0] + 1)
+        elif node.type in ('function_declaration', 'generator_function_declaration', 'method_definition'):
+            functions.append(_text(node.child_by_field_name('name')), node.start_point[0] + 1, node.end_point[0] + 1)
+        elif node.type == 'import_statement':
+            lineno = node.start_point[0] + 1
+            for name in _js_imported_names(node):
+                imports.append(name, lineno)
+            continue
+        
+        if node.type in _JS_CONTAINER_TYPES:
+            # Reversed so statements are visited in source order
+            stack.extend(reversed(node.named_children))
+    
+    return structure
+
+def parse_python_file(file_path: str) -> Dict[str, SymbolColumns]:
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return _parse_python(data, file_path)
+    except Exception as e:
+        print(f"Error parsing {file_path}: {str(e)}")
+        return _empty_structure()
+
+def parse_file_for_indexing(file_path: str) -> Dict[str, Any]:
+    """Parse a Python, JavaScript or TypeScript file into the structure the indexer stores."""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        
+        suffix = os.path.splitext(file_path)[1]
+        if suffix == '.py':
+            structure = _parse_python(data, file_path)
+        else:
+            structure = _parse_js_with_tree_sitter(data, suffix)
+        
+        result: Dict[str, Any] = {kind: columns.to_dicts() for kind, columns in structure.items()}
+        result['success'] = True
+        return result
+    except Exception as e:
+        return {
+            'error': str(e),
+            'success': False
+        }
\ No newline at end of file
@@ -1,16 +1,17 @@
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
 from collections import defaultdict
-import ast
-import json
 from pathlib import Path
-import hashlib
-import time
+import mmap
+import sqlite3
 from datetime import datetime, timedelta
-import schedule
-import threading
-from .neo4j_service import neo4j_service
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import xxhash
+import orjson
+from .code_parser import parse_file_for_indexing
+from .parse_pool import get_parse_pool
+from .neo4j_service import get_neo4j_service
 
 # Global state to track indexing progress for multiple repositories
 indexing_status = defaultdict(lambda: {
@@ -26,19 +27,148 @@ file_history = defaultdict(lambda: {
     "files": {}
 })
 
+# Events that status stream listeners wait on, with the event loop they belong to;
+# each status change sets and drops the repository's event
+status_events: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+# Directories whose subtrees are never indexed
+SKIP_DIRS = frozenset({".git", "node_modules", "__pycache__", "venv", ".venv"})
+
+# Extensions of the files that are indexed
+INDEXED_EXTENSIONS = ('.py', '.js', '.ts', '.tsx', '.jsx')
+
+# Most files being indexed at once; their blocking work shares the default executor
+INDEXING_CONCURRENCY = 8
+
+# Files whose nodes are written to Neo4j together, in one transaction
+NEO4J_BATCH_SIZE = 500
+
+# Files at least this large are hashed through a memory map rather than read into memory
+HASH_MMAP_THRESHOLD = 1024 * 1024
+
+# SQLite database file history is persisted to, so changes are still detected
+# (and unchanged files not rehashed or reparsed) after a restart
+HISTORY_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'index.db')
+
 # Store scheduling information
 indexing_schedules = {}
-schedule_thread = None
-is_schedule_running = False
 
-def calculate_file_hash(file_path: str) -> str:
-    """Calculate a hash of the file contents to detect changes."""
+# Scheduled indexing runs as jobs on the server's event loop, one per repository,
+# with the repository path as the job ID
+scheduler = AsyncIOScheduler()
+
+# Cron day_of_week values of the days a weekly schedule accepts
+WEEKDAYS = {
+    "monday": "mon",
+    "tuesday": "tue",
+    "wednesday": "wed",
+    "thursday": "thu",
+    "friday": "fri",
+    "saturday": "sat",
+    "sunday": "sun",
+}
+
+def calculate_file_hash(file_path: str, size: Optional[int] = None) -> str:
+    """Calculate an xxHash3 (128-bit) hash of the file contents to detect changes."""
     try:
         with open(file_path, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+            # Callers that have just stat'ed the file pass its size, saving an fstat
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+            if size < HASH_MMAP_THRESHOLD:
+                return xxhash.xxh3_128_hexdigest(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return xxhash.xxh3_128_hexdigest(mm)
     except Exception:
         return ""
 
+def connect_history_db() -> sqlite3.Connection:
+    """Open the file history database, creating its tables if needed."""
+    os.makedirs(os.path.dirname(HISTORY_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(HISTORY_DB_PATH)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS repositories (repo TEXT PRIMARY KEY, last_indexed TEXT, changes BLOB);
+        CREATE TABLE IF NOT EXISTS files (
+            repo TEXT, path TEXT, hash TEXT, size INTEGER, mtime REAL, mtime_ns INTEGER,
+            PRIMARY KEY (repo, path)
+        );
+        CREATE TABLE IF NOT EXISTS parsed (repo TEXT, path TEXT, hash TEXT, result BLOB, PRIMARY KEY (repo, path));
+    """)
+    return conn
+
+def load_file_history():
+    """Load the persisted file history of every repository into file_history."""
+    try:
+        conn = connect_history_db()
+    except sqlite3.Error as e:
+        print(f"Error opening file history database: {str(e)}")
+        return
+    
+    try:
+        for repo, last_indexed, changes in conn.execute("SELECT repo, last_indexed, changes FROM repositories"):
+            file_history[repo]["last_indexed"] = last_indexed
+            file_history[repo]["changes"] = orjson.loads(changes)
+        
+        for repo, path, file_hash, size, mtime, mtime_ns in conn.execute(
+            "SELECT repo, path, hash, size, mtime, mtime_ns FROM files"
+        ):
+            file_history[repo]["files"][path] = {
+                "hash": file_hash,
+                "last_modified": mtime,
+                "size": size,
+                "mtime_ns": mtime_ns
+            }
+        
+        for repo, path, file_hash, result in conn.execute("SELECT repo, path, hash, result FROM parsed"):
+            file_history[repo].setdefault("parsed", {})[path] = {"hash": file_hash, "result": orjson.loads(result)}
+    except sqlite3.Error as e:
+        print(f"Error loading file history: {str(e)}")
+    finally:
+        conn.close()
+
+def save_file_history(repo_path: str):
+    """Replace a repository's persisted file history with the current one, in one transaction."""
+    history = file_history[repo_path]
+    conn = connect_history_db()
+    try:
+        with conn:
+            conn.execute("DELETE FROM files WHERE repo = ?", (repo_path,))
+            conn.execute("DELETE FROM parsed WHERE repo = ?", (repo_path,))
+            conn.executemany(
+                "INSERT INTO files (repo, path, hash, size, mtime, mtime_ns) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (repo_path, path, state["hash"], state["size"], state["last_modified"], state["mtime_ns"])
+                    for path, state in history["files"].items()
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO parsed (repo, path, hash, result) VALUES (?, ?, ?, ?)",
+                [
+                    (repo_path, path, entry["hash"], orjson.dumps(entry["result"]))
+                    for path, entry in history.get("parsed", {}).items()
+                ]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO repositories (repo, last_indexed, changes) VALUES (?, ?, ?)",
+                (repo_path, history["last_indexed"], orjson.dumps(history.get("changes", {})))
+            )
+    finally:
+        conn.close()
+
+def get_file_state(file_path: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stat and hash a file, reusing the previous hash while its size and mtime are unchanged."""
+    stat = os.stat(file_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        file_hash = previous["hash"]
+    else:
+        file_hash = calculate_file_hash(file_path, stat.st_size)
+    return {
+        "hash": file_hash,
+        "last_modified": stat.st_mtime,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+
 def get_file_type(file_path: str) -> str:
     """Get the file type based on extension."""
     ext = os.path.splitext(file_path)[1].lower()
@@ -51,82 +181,77 @@ def get_file_type(file_path: str) -> str:
     else:
         return 'unknown'
 
+def list_indexable_files(repo_path: str) -> List[Tuple[str, str]]:
+    """List the files to be indexed as (path, path relative to the repository) pairs."""
+    # Directories are walked with scandir, pruning skipped subtrees
+    # instead of filtering every path beneath them
+    file_paths = []
+    stack = [(repo_path, '')]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # Like os.walk, symlinked directories are not followed
+                    if entry.name not in SKIP_DIRS and not entry.is_symlink():
+                        subdirs.append((entry.path, rel_dir + entry.name + os.sep))
+                elif entry.name.endswith(INDEXED_EXTENSIONS):
+                    file_paths.append((entry.path, rel_dir + entry.name))
+            except OSError:
+                continue
+        # Reversed so subdirectories are walked in listing order, as os.walk does
+        stack.extend(reversed(subdirs))
+    return file_paths
+
 async def count_files(repo_path: str) -> int:
     """Count the total number of files to be indexed."""
-    total = 0
-    for root, _, files in os.walk(repo_path):
-        if any(skip in root for skip in [".git", "node_modules", "__pycache__", "venv"]):
-            continue
-        total += len([f for f in files if f.endswith(('.py', '.js', '.ts', '.tsx', '.jsx'))])
-    return total
+    return len(list_indexable_files(repo_path))
+
+def get_status_event(repo_path: str) -> asyncio.Event:
+    """Get an event that is set on the repository's next indexing status change."""
+    entry = status_events.get(repo_path)
+    if entry is None:
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        status_events[repo_path] = entry
+    return entry[1]
 
-async def parse_python_file(file_path: str) -> Dict:
-    """Parse a Python file and extract its AST structure."""
+def notify_status_change(repo_path: str):
+    """Wake status listeners of a repository."""
+    entry = status_events.pop(repo_path, None)
+    if entry is None:
+        return
+    loop, event = entry
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        tree = ast.parse(content)
-        
-        # Extract classes, functions, and imports
-        classes = []
-        functions = []
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                classes.append({
-                    'name': node.name,
-                    'lineno': node.lineno,
-                    'end_lineno': node.end_lineno,
-                })
-            elif isinstance(node, ast.FunctionDef):
-                functions.append({
-                    'name': node.name,
-                    'lineno': node.lineno,
-                    'end_lineno': node.end_lineno,
-                })
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.append({
-                            'name': name.name,
-                            'lineno': node.lineno
-                        })
-                else:
-                    module = node.module or ''
-                    for name in node.names:
-                        imports.append({
-                            'name': f"{module}.{name.name}",
-                            'lineno': node.lineno
-                        })
-        
-        return {
-            'classes': classes,
-            'functions': functions,
-            'imports': imports,
-            'success': True
-        }
-    except Exception as e:
-        return {
-            'error': str(e),
-            'success': False
-        }
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        event.set()
+    elif not loop.is_closed():
+        # Indexing started outside the server's event loop (from another thread) wakes it safely
+        loop.call_soon_threadsafe(event.set)
 
 async def update_indexing_status(repo_path: str, current_file: str = None, increment_processed: bool = False):
     """Update the indexing status for a repository."""
+    # total_files is set by start_indexing from its listing of the files
     status = indexing_status[repo_path]
     
-    if not status["total_files"]:
-        status["total_files"] = await count_files(repo_path)
-    
     if current_file:
         status["current_file"] = current_file
     
     if increment_processed:
         status["processed_files"] += 1
-        
-    if status["processed_files"] >= status["total_files"]:
-        status["completed"] = True
+    
+    # Completion is set by start_indexing alone, once the graph and file history are
+    # written: with files processed concurrently, the last count comes before that
+    notify_status_change(repo_path)
 
 async def get_indexing_status(repo_path: str) -> Dict[str, Any]:
     """Get the current indexing status for a repository."""
@@ -142,13 +267,21 @@ async def start_indexing(repo_path: str, clear_existing: bool = True):
         "completed": False
     }
     
-    # Clear existing nodes if requested
+    loop = asyncio.get_running_loop()
+    neo4j_service = await get_neo4j_service()
+    
+    # Clear existing nodes if requested. Otherwise files whose content hash matches
+    # the one stored on their node are already in the graph and aren't written again
+    stored_hashes = {}
     if clear_existing:
-        neo4j_service.clear_database()
+        await neo4j_service.clear_database()
+    else:
+        stored_hashes = await neo4j_service.get_file_hashes(repo_path)
     
-    # Count total files first
-    total_files = await count_files(repo_path)
-    indexing_status[repo_path]["total_files"] = total_files
+    # List the files once; their count is the status total
+    file_paths = await loop.run_in_executor(None, list_indexable_files, repo_path)
+    indexing_status[repo_path]["total_files"] = len(file_paths)
+    notify_status_change(repo_path)
     
     # Track changes
     changed_files = []
@@ -157,56 +290,78 @@ async def start_indexing(repo_path: str, clear_existing: bool = True):
     
     # Store the current state of files to compare with previous runs
     current_files = {}
+    previous_files = file_history[repo_path]["files"]
     
-    # Process each file
-    for root, _, files in os.walk(repo_path):
-        if any(skip in root for skip in [".git", "node_modules", "__pycache__", "venv"]):
-            continue
+    # Parse results by file, with the hash of the content they were parsed from;
+    # files whose hash is unchanged since the last run are not parsed again
+    previous_parsed = file_history[repo_path].get("parsed", {})
+    parsed = {}
+    
+    # Hashing blocks, so it runs on the default executor and parsing on the process pool, with up to INDEXING_CONCURRENCY files in flight
+    semaphore = asyncio.Semaphore(INDEXING_CONCURRENCY)
+    
+    # File nodes and their structure, written to Neo4j NEO4J_BATCH_SIZE files at a time
+    pending_files = []
+    
+    async def flush_pending_files():
+        nonlocal pending_files
+        batch, pending_files = pending_files, []
+        if batch:
+            await writer.upsert_files(repo_path, batch)
+    
+    async def index_file(file_path: str, rel_path: str):
+        async with semaphore:
+            file_state = await loop.run_in_executor(None, get_file_state, file_path, previous_files.get(rel_path))
+            
+            await update_indexing_status(repo_path, rel_path)
+            
+            file_row = {
+                "path": rel_path,
+                "type": get_file_type(file_path),
+                "name": os.path.basename(rel_path),
+                "hash": file_state["hash"],
+                "classes": [],
+                "functions": [],
+                "imports": []
+            }
+            
+            # Parse the file; the parser is chosen by its extension
+            cached = previous_parsed.get(rel_path)
+            if cached and cached["hash"] == file_state["hash"]:
+                result = cached["result"]
+            else:
+                result = await loop.run_in_executor(get_parse_pool(), parse_file_for_indexing, file_path)
+            parse_entry = {"hash": file_state["hash"], "result": result}
+            if result['success']:
+                # Store parsed data in Neo4j with the file node
+                file_row["classes"] = result['classes']
+                file_row["functions"] = result['functions']
+                file_row["imports"] = result['imports']
             
-        for file in files:
-            if file.endswith(('.py', '.js', '.ts', '.tsx', '.jsx')):
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, repo_path)
-                
-                # Calculate file hash for change detection
-                file_hash = calculate_file_hash(file_path)
-                current_files[rel_path] = {
-                    "hash": file_hash,
-                    "last_modified": os.path.getmtime(file_path)
-                }
-                
-                # Check if file is new or changed
-                if rel_path not in file_history[repo_path]["files"]:
-                    new_files.append(rel_path)
-                elif file_history[repo_path]["files"][rel_path]["hash"] != file_hash:
-                    changed_files.append(rel_path)
-                
-                await update_indexing_status(repo_path, rel_path, True)
-                
-                # Get file type
-                file_type = get_file_type(file_path)
-                
-                # Create file node in Neo4j
-                file_id = neo4j_service.create_or_update_file_node(
-                    repo_path=repo_path,
-                    file_path=rel_path,
-                    file_type=file_type
-                )
-                
-                # Parse the file based on its type
-                if file.endswith('.py'):
-                    result = await parse_python_file(file_path)
-                    if result['success']:
-                        # Store parsed data in Neo4j
-                        neo4j_service.create_module_structure(
-                            file_id=file_id,
-                            classes=result['classes'],
-                            functions=result['functions'],
-                            imports=result['imports']
-                        )
-                
-                # Add a small delay to avoid overwhelming the system
-                await asyncio.sleep(0.1)
+            if stored_hashes.get(rel_path) != file_state["hash"]:
+                pending_files.append(file_row)
+                if len(pending_files) >= NEO4J_BATCH_SIZE:
+                    await flush_pending_files()
+            
+            # Counted once parsed and queued for writing, not when it starts
+            await update_indexing_status(repo_path, increment_processed=True)
+            return rel_path, file_state, parse_entry
+    
+    # Process each file; the batches are written through one session held for the run
+    async with neo4j_service.bulk() as writer:
+        results = await asyncio.gather(*[index_file(file_path, rel_path) for file_path, rel_path in file_paths])
+        await flush_pending_files()
+    
+    for rel_path, file_state, parse_entry in results:
+        current_files[rel_path] = file_state
+        parsed[rel_path] = parse_entry
+        
+        # Check if file is new or changed
+        previous = previous_files.get(rel_path)
+        if previous is None:
+            new_files.append(rel_path)
+        elif previous["hash"] != file_state["hash"]:
+            changed_files.append(rel_path)
     
     # Check for deleted files
     if file_history[repo_path]["files"]:
@@ -216,6 +371,7 @@ async def start_indexing(repo_path: str, clear_existing: bool = True):
     
     # Update file history
     file_history[repo_path]["files"] = current_files
+    file_history[repo_path]["parsed"] = parsed
     file_history[repo_path]["last_indexed"] = datetime.now().isoformat()
     file_history[repo_path]["changes"] = {
         "new": new_files,
@@ -223,44 +379,26 @@ async def start_indexing(repo_path: str, clear_existing: bool = True):
         "deleted": deleted_files
     }
     
+    try:
+        await loop.run_in_executor(None, save_file_history, repo_path)
+    except Exception as e:
+        print(f"Error saving file history for {repo_path}: {str(e)}")
+    
     # Mark as completed
     indexing_status[repo_path]["completed"] = True
     indexing_status[repo_path]["current_file"] = "Indexing complete"
+    notify_status_change(repo_path)
 
 # Schedule-related functions
-def run_scheduled_index(repo_path: str):
-    """Run indexing on the scheduled time (called by scheduler)"""
-    async def _run():
-        await start_indexing(repo_path, False)
-    
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(_run())
-    loop.close()
-
 def start_scheduler():
-    """Start the scheduler thread"""
-    global schedule_thread, is_schedule_running
-    
-    if is_schedule_running:
-        return
-    
-    def run_scheduler():
-        global is_schedule_running
-        is_schedule_running = True
-        while is_schedule_running:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-    
-    schedule_thread = threading.Thread(target=run_scheduler, daemon=True)
-    schedule_thread.start()
+    """Start the scheduler on the running event loop"""
+    if not scheduler.running:
+        scheduler.start()
 
 def stop_scheduler():
-    """Stop the scheduler thread"""
-    global is_schedule_running
-    is_schedule_running = False
-    if schedule_thread:
-        schedule_thread.join(timeout=2.0)
+    """Stop the scheduler"""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
 
 async def set_indexing_schedule(repo_path: str, 
                                schedule_type: str, 
@@ -275,8 +413,8 @@ async def set_indexing_schedule(repo_path: str,
         day_of_week: Day of week for weekly schedules
     """
     # Clear any existing schedule for this repo
-    if repo_path in indexing_schedules:
-        schedule.clear(repo_path)
+    if scheduler.get_job(repo_path):
+        scheduler.remove_job(repo_path)
     
     # Set up scheduling based on the type
     if schedule_type == 'none':
@@ -284,8 +422,11 @@ async def set_indexing_schedule(repo_path: str,
             del indexing_schedules[repo_path]
         return {"success": True, "message": "Indexing schedule removed"}
     
+    # Scheduled runs index incrementally, without clearing the database
+    job_options = {"args": [repo_path, False], "id": repo_path, "replace_existing": True}
+    
     if schedule_type == 'hourly':
-        job = schedule.every().hour.do(run_scheduled_index, repo_path)
+        scheduler.add_job(start_indexing, 'interval', hours=1, **job_options)
         schedule_info = {"type": "hourly"}
     
     elif schedule_type == 'daily':
@@ -293,7 +434,7 @@ async def set_indexing_schedule(repo_path: str,
             time_value = "00:00"  # Default to midnight
         
         hour, minute = map(int, time_value.split(':'))
-        job = schedule.every().day.at(time_value).do(run_scheduled_index, repo_path)
+        scheduler.add_job(start_indexing, 'cron', hour=hour, minute=minute, **job_options)
         schedule_info = {"type": "daily", "time": time_value}
     
     elif schedule_type == 'weekly':
@@ -303,22 +444,12 @@ async def set_indexing_schedule(repo_path: str,
         if not time_value:
             time_value = "00:00"  # Default to midnight
         
-        # Map day string to schedule method
-        day_methods = {
-            "monday": schedule.every().monday,
-            "tuesday": schedule.every().tuesday,
-            "wednesday": schedule.every().wednesday,
-            "thursday": schedule.every().thursday,
-            "friday": schedule.every().friday,
-            "saturday": schedule.every().saturday,
-            "sunday": schedule.every().sunday,
-        }
-        
-        day_scheduler = day_methods.get(day_of_week.lower())
-        if not day_scheduler:
+        weekday = WEEKDAYS.get(day_of_week.lower())
+        if not weekday:
             return {"success": False, "message": f"Invalid day of week: {day_of_week}"}
         
-        job = day_scheduler.at(time_value).do(run_scheduled_index, repo_path)
+        hour, minute = map(int, time_value.split(':'))
+        scheduler.add_job(start_indexing, 'cron', day_of_week=weekday, hour=hour, minute=minute, **job_options)
         schedule_info = {"type": "weekly", "day": day_of_week, "time": time_value}
     
     else:
@@ -346,7 +477,8 @@ async def get_indexing_schedule(repo_path: str) -> Dict[str, Any]:
 # New function to get code graph for visualization
 async def get_code_graph(repo_path: str, depth: int = 2) -> Dict[str, Any]:
     """Get the code graph for visualization."""
-    return neo4j_service.get_code_graph(repo_path, depth)
+    neo4j_service = await get_neo4j_service()
+    return await neo4j_service.get_code_graph(repo_path, depth)
 
 # New endpoints for retrieving file history and changes
 async def get_file_history(repo_path: str) -> Dict[str, Any]:
@@ -1,131 +1,405 @@
 import os
-from typing import Dict, List, Any, Optional
-from neo4j import GraphDatabase
+import asyncio
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from neo4j import AsyncGraphDatabase, RoutingControl
+from neo4j.exceptions import ServiceUnavailable, TransientError
 from dotenv import load_dotenv
+import docker
 import logging
+import orjson
+import random
+import socket
 import subprocess
 import time
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Neo4j connection settings are read from the environment (and .env) by
+# Neo4jService, when one is created rather than on import
+DEFAULT_DOCKER_COMPOSE_PATH = "/Users/shaanp/Documents/GitHub/apinpc/mcp_code_indexer/mcp_server/neo4j-mcp/docker-compose.yml"
 
-# Neo4j connection settings (default values provided)
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "your_password")
-DOCKER_COMPOSE_PATH = os.getenv("DOCKER_COMPOSE_PATH", "/Users/shaanp/Documents/GitHub/apinpc/mcp_code_indexer/mcp_server/neo4j-mcp/docker-compose.yml")
-USE_DOCKER = os.getenv("USE_DOCKER", "true").lower() == "true"
+# Connection retries back off exponentially from RETRY_BASE_DELAY seconds up to
+# RETRY_MAX_DELAY, each delay stretched by up to RETRY_JITTER so that clients
+# retrying at the same time drift apart
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRY_JITTER = 0.5
+
+# Connection attempts when the service starts, and while a just-started container boots
+CONNECT_ATTEMPTS = 5
+DOCKER_START_ATTEMPTS = 8
+
+# Indexes behind the service's MERGEs, which would otherwise scan every node of their
+# label, and behind looking up a repository's files for its graph
+SCHEMA_QUERIES = (
+    "CREATE INDEX file_repo_path IF NOT EXISTS FOR (f:File) ON (f.repo, f.path)",
+    "CREATE INDEX file_repo IF NOT EXISTS FOR (f:File) ON (f.repo)",
+    "CREATE INDEX class_file_id_name IF NOT EXISTS FOR (c:Class) ON (c.file_id, c.name)",
+    "CREATE INDEX function_file_id_name IF NOT EXISTS FOR (fn:Function) ON (fn.file_id, fn.name)",
+    "CREATE INDEX import_file_id_name IF NOT EXISTS FOR (i:Import) ON (i.file_id, i.name)",
+)
+
+# Cypher the service runs, defined once here rather than inline in its methods
+CLEAR_DATABASE_QUERY = "MATCH (n) DETACH DELETE n"
+
+FILE_NODE_QUERY = """
+MERGE (f:File {path: $path, repo: $repo})
+SET f.type = $type,
+    f.name = $name,
+    f.last_updated = timestamp()
+RETURN elementId(f) as node_id
+"""
+
+# One query for all of a file's nodes, rather than a round-trip per class,
+# function and import
+MODULE_STRUCTURE_QUERY = """
+MATCH (f:File)
+WHERE elementId(f) = $file_id
+FOREACH (cls IN $classes |
+    MERGE (c:Class {name: cls.name, file_id: $file_id})
+    SET c.line_start = cls.lineno,
+        c.line_end = cls.end_lineno
+    MERGE (f)-[:CONTAINS]->(c)
+)
+FOREACH (func IN $functions |
+    MERGE (fn:Function {name: func.name, file_id: $file_id})
+    SET fn.line_start = func.lineno,
+        fn.line_end = func.end_lineno
+    MERGE (f)-[:CONTAINS]->(fn)
+)
+FOREACH (imp IN $imports |
+    MERGE (i:Import {name: imp.name, file_id: $file_id})
+    SET i.line = imp.lineno
+    MERGE (f)-[:IMPORTS]->(i)
+)
+"""
+
+# A batch of files with their structure nodes, in one query
+UPSERT_FILES_QUERY = """
+UNWIND $files AS file
+MERGE (f:File {path: file.path, repo: $repo})
+SET f.type = file.type,
+    f.name = file.name,
+    f.content_hash = file.hash,
+    f.last_updated = timestamp()
+WITH f, file, elementId(f) AS file_id
+FOREACH (cls IN file.classes |
+    MERGE (c:Class {name: cls.name, file_id: file_id})
+    SET c.line_start = cls.lineno,
+        c.line_end = cls.end_lineno
+    MERGE (f)-[:CONTAINS]->(c)
+)
+FOREACH (func IN file.functions |
+    MERGE (fn:Function {name: func.name, file_id: file_id})
+    SET fn.line_start = func.lineno,
+        fn.line_end = func.end_lineno
+    MERGE (f)-[:CONTAINS]->(fn)
+)
+FOREACH (imp IN file.imports |
+    MERGE (i:Import {name: imp.name, file_id: file_id})
+    SET i.line = imp.lineno
+    MERGE (f)-[:IMPORTS]->(i)
+)
+"""
+
+# Content hashes of a repository's files as of their last write
+FILE_HASHES_QUERY = """
+MATCH (f:File {repo: $repo})
+RETURN f.path AS path, f.content_hash AS hash
+"""
+
+# The repository's files anchor the query (rather than an OR over every node's repo
+# and file_id), and the nodes they contain or import are reached through their
+# relationships
+CODE_GRAPH_QUERY = """
+MATCH (f:File {repo: $repo})
+OPTIONAL MATCH (f)-[r]->(child)
+WITH collect(DISTINCT f) + collect(DISTINCT child) AS graph_nodes,
+     collect(r) AS graph_links
+RETURN [n IN graph_nodes | {id: elementId(n), labels: labels(n), props: properties(n)}] AS nodes,
+       [r IN graph_links | {source: elementId(startNode(r)), target: elementId(endNode(r)), type: type(r)}] AS links
+"""
+
+# Counts of the nodes and links CODE_GRAPH_QUERY returns, per repository
+GRAPH_COUNTS_QUERY = """
+UNWIND $repos AS repo
+OPTIONAL MATCH (f:File {repo: repo})
+OPTIONAL MATCH (f)-[r]->(child)
+WITH repo, collect(DISTINCT f) AS files, collect(DISTINCT child) AS children, count(r) AS link_count
+RETURN repo,
+       size(files) + size([c IN children WHERE NOT c IN files]) AS node_count,
+       link_count
+"""
+
+# Nodes or links encoded into each chunk of a streamed code graph; a chunk per item
+# would mean a send (and a gzip flush) for each of them
+GRAPH_STREAM_CHUNK_SIZE = 1000
+
+# Fetched code graphs kept per repository, least recently used first. Writes through
+# the service invalidate a repository's graph; the TTL bounds how long changes made
+# outside it go unseen
+GRAPH_CACHE_SIZE = 32
+GRAPH_CACHE_TTL = 60.0
+
+# Seconds to wait on Neo4j's Bolt port when checking whether it is already up
+PORT_PROBE_TIMEOUT = 0.1
+
+def neo4j_port_open(neo4j_uri: str) -> bool:
+    """Check whether something accepts connections on the Bolt port of a Neo4j URI."""
+    uri = urlparse(neo4j_uri)
+    try:
+        with socket.create_connection((uri.hostname or "localhost", uri.port or 7687), timeout=PORT_PROBE_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait after failed attempt number attempt (from 0): exponential, capped, jittered."""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * (1 + random.uniform(0, RETRY_JITTER))
+
+async def verify_with_backoff(driver, attempts: int):
+    """Verify that a driver reaches Neo4j, retrying with backoff while the server is unavailable."""
+    for attempt in range(attempts):
+        try:
+            await driver.verify_connectivity()
+            return
+        except (ServiceUnavailable, TransientError) as e:
+            if attempt == attempts - 1:
+                raise
+            delay = backoff_delay(attempt)
+            logger.info(f"Neo4j unavailable, retrying in {delay:.1f}s ({attempt + 1}/{attempts}): {e}")
+            await asyncio.sleep(delay)
+
+def _iter_json_items(items: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode items as the comma-separated body of a JSON array, GRAPH_STREAM_CHUNK_SIZE items per chunk."""
+    chunk = []
+    first = True
+    for item in items:
+        chunk.append(orjson.dumps(item))
+        if len(chunk) >= GRAPH_STREAM_CHUNK_SIZE:
+            yield (b"" if first else b",") + b",".join(chunk)
+            chunk = []
+            first = False
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+
+class BulkWriter:
+    """Writes batches of files through one session held across a run of writes."""
+    
+    def __init__(self, service: "Neo4jService", session=None):
+        self.service = service
+        self.session = session
+        # A session runs one transaction at a time, so overlapping batches take turns
+        self._lock = asyncio.Lock()
+    
+    async def upsert_files(self, repo_path: str, files: List[Dict[str, Any]]):
+        """Create or update file nodes and their structure nodes, as Neo4jService.upsert_files does."""
+        if not files:
+            return
+        
+        # Without a session (Neo4j was unreachable when the run began) the service
+        # writes the batch itself, reconnecting if it can
+        if self.session is None:
+            await self.service.upsert_files(repo_path, files)
+            return
+        
+        async with self._lock:
+            try:
+                await self.session.execute_write(Neo4jService._tx_upsert_files, repo_path, files)
+            except Exception as e:
+                logger.error(f"Error upserting files: {e}")
+            finally:
+                self.service.invalidate_code_graph(repo_path)
 
 class Neo4jService:
     """Service for interacting with Neo4j graph database."""
     
-    def __init__(self, auto_start_docker=USE_DOCKER):
-        """Initialize the Neo4j service with connection settings."""
+    # Whether the indexes have been created; once is enough for the process
+    schema_initialized = False
+    # Whether .env has been loaded; once is enough for the process
+    _env_loaded = False
+    
+    def __init__(self, auto_start_docker: Optional[bool] = None):
+        """Initialize the Neo4j service with connection settings; connect() connects it."""
+        if not Neo4jService._env_loaded:
+            load_dotenv()
+            Neo4jService._env_loaded = True
+        
+        # Neo4j connection settings (default values provided)
+        self.uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+        self.user = os.getenv("NEO4J_USER", "neo4j")
+        self.password = os.getenv("NEO4J_PASSWORD", "your_password")
+        self.docker_compose_path = os.getenv("DOCKER_COMPOSE_PATH", DEFAULT_DOCKER_COMPOSE_PATH)
+        # Naming the database spares the driver a round-trip to resolve the user's home database
+        self.database = os.getenv("NEO4J_DATABASE", "neo4j")
+        
+        # Connection pool of the service's driver. Queries borrow pooled connections, so
+        # requests reuse open, authenticated connections instead of handshaking each time
+        self.max_pool_size = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+        self.connection_acquisition_timeout = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30"))  # Seconds to wait for a free pooled connection
+        self.max_connection_lifetime = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))  # Seconds before a pooled connection is replaced
+        # Seconds to wait for a connection to be established, which bounds each
+        # connectivity check against a server that is down or still booting
+        self.connection_timeout = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5"))
+        
+        if auto_start_docker is None:
+            auto_start_docker = os.getenv("USE_DOCKER", "true").lower() == "true"
+        
         self.connected = False
+        self.driver = None
+        # Created on the event loop, by connect()
+        self._reconnect_lock: Optional[asyncio.Lock] = None
+        # Failed reconnects in a row, and when the next one may be attempted
+        self._reconnect_failures = 0
+        self._next_reconnect_at = 0.0
         self.auto_start_docker = auto_start_docker
-        
+        # Graph records by (repository, its write version, write generation), with
+        # when they were fetched. A write bumps its repository's version, or the
+        # generation when it may touch any repository, so stale entries aren't found
+        self._graph_cache: "OrderedDict[Tuple[str, int, int], Tuple[float, Any]]" = OrderedDict()
+        self._repo_versions: Dict[str, int] = defaultdict(int)
+        self._graph_generation = 0
+    
+    def _create_driver(self):
+        """Create an async Neo4j driver with the service's connection pool settings."""
+        # The driver is asynchronous, so queries wait on the event loop rather than each
+        # holding a threadpool thread; it belongs to the loop it is first used on
+        return AsyncGraphDatabase.driver(
+            self.uri,
+            auth=(self.user, self.password),
+            max_connection_pool_size=self.max_pool_size,
+            connection_acquisition_timeout=self.connection_acquisition_timeout,
+            max_connection_lifetime=self.max_connection_lifetime,
+            connection_timeout=self.connection_timeout,
+            # TCP keep-alive stops idle pooled connections from being silently dropped
+            keep_alive=True
+        )
+    
+    def invalidate_code_graph(self, repo_path: Optional[str] = None):
+        """Stop serving a repository's cached code graph, or every repository's if none is given."""
+        if repo_path is None:
+            self._graph_generation += 1
+        else:
+            self._repo_versions[repo_path] += 1
+    
+    async def connect(self):
+        """Connect to Neo4j, first starting its Docker container if configured to."""
+        self._reconnect_lock = asyncio.Lock()
+        attempts = CONNECT_ATTEMPTS
         if self.auto_start_docker:
-            self._ensure_docker_running()
+            # Probing the port and running docker block, so they run on the executor
+            if await asyncio.get_running_loop().run_in_executor(None, self._ensure_docker_running):
+                # Wait for the just-started container to boot
+                logger.info("Waiting for Neo4j to start...")
+                attempts = DOCKER_START_ATTEMPTS
         
         try:
-            self.driver = GraphDatabase.driver(
-                NEO4J_URI, 
-                auth=(NEO4J_USER, NEO4J_PASSWORD)
-            )
+            self.driver = self._create_driver()
             # Test the connection
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            await verify_with_backoff(self.driver, attempts)
             self.connected = True
             logger.info("Successfully connected to Neo4j")
+            await self.ensure_schema()
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
+            await self.close()
             self.driver = None
 
-    def _ensure_docker_running(self):
-        """Ensure that the Neo4j Docker container is running."""
-        if not os.path.exists(DOCKER_COMPOSE_PATH):
-            logger.warning(f"Docker compose file not found at: {DOCKER_COMPOSE_PATH}")
-            return
+    def _ensure_docker_running(self) -> bool:
+        """Ensure that the Neo4j Docker container is running; True if it had to be started."""
+        # Neo4j already listening, in Docker or not: skip the docker subprocesses
+        if neo4j_port_open(self.uri):
+            return False
+        
+        if not os.path.exists(self.docker_compose_path):
+            logger.warning(f"Docker compose file not found at: {self.docker_compose_path}")
+            return False
             
         try:
-            # Check if container is already running
-            result = subprocess.run(
-                ["docker", "ps", "--filter", "name=neo4j", "--format", "{{.Names}}"],
-                capture_output=True,
-                text=True
-            )
+            # Check if container is already running, asking the daemon over its socket
+            # rather than forking the docker CLI
+            client = docker.from_env()
+            try:
+                running = client.containers.list(filters={"name": "neo4j"})
+            finally:
+                client.close()
             
-            if "neo4j" not in result.stdout:
+            if not running:
                 logger.info("Starting Neo4j Docker container...")
                 
-                # Start the Docker container
+                # Start the Docker container; compose has no API in the SDK, so this
+                # one call still goes through its CLI
                 subprocess.run(
-                    ["docker-compose", "-f", DOCKER_COMPOSE_PATH, "up", "-d"],
+                    ["docker-compose", "-f", self.docker_compose_path, "up", "-d"],
                     check=True
                 )
-                
-                # Wait for Neo4j to start
-                max_attempts = 30
-                for attempt in range(max_attempts):
-                    try:
-                        logger.info(f"Waiting for Neo4j to start... attempt {attempt+1}/{max_attempts}")
-                        time.sleep(2)
-                        temp_driver = GraphDatabase.driver(
-                            NEO4J_URI, 
-                            auth=(NEO4J_USER, NEO4J_PASSWORD)
-                        )
-                        with temp_driver.session() as session:
-                            session.run("RETURN 1")
-                        temp_driver.close()
-                        logger.info("Neo4j Docker container is now running")
-                        return
-                    except Exception as e:
-                        if attempt == max_attempts - 1:
-                            logger.error(f"Failed to connect to Neo4j after {max_attempts} attempts: {e}")
+                return True
             else:
                 logger.info("Neo4j Docker container is already running")
         except Exception as e:
             logger.error(f"Error managing Docker container: {e}")
+        return False
+    
+    async def ensure_schema(self):
+        """Create the indexes the service's queries rely on, if they don't exist yet."""
+        if Neo4jService.schema_initialized:
+            return
+        
+        try:
+            for query in SCHEMA_QUERIES:
+                await self.driver.execute_query(query, database_=self.database, routing_=RoutingControl.WRITE)
+            Neo4jService.schema_initialized = True
+        except Exception as e:
+            logger.error(f"Error creating indexes: {e}")
     
-    def close(self):
+    async def close(self):
         """Close the Neo4j connection."""
         if self.driver:
-            self.driver.close()
+            await self.driver.close()
     
-    def clear_database(self):
+    async def clear_database(self):
         """Clear all nodes and relationships in the database."""
         if not self.connected:
             logger.warning("Cannot clear database: Not connected to Neo4j")
             return
         
         try:
-            with self.driver.session() as session:
-                session.run("MATCH (n) DETACH DELETE n")
+            # A managed transaction, so the driver retries it on transient errors
+            async with self.driver.session(database=self.database) as session:
+                await session.execute_write(self._tx_clear_database)
         except Exception as e:
             logger.error(f"Error clearing database: {e}")
+        finally:
+            self.invalidate_code_graph()
+    
+    @staticmethod
+    async def _tx_clear_database(tx):
+        """Delete all nodes and relationships inside a transaction."""
+        result = await tx.run(CLEAR_DATABASE_QUERY)
+        await result.consume()
 
-    def reconnect(self):
+    async def reconnect(self):
         """Reconnect to the Neo4j database."""
         try:
-            if self.driver:
-                self.driver.close()
-                
+            await self.close()
+            
+            attempts = 1
             if self.auto_start_docker:
-                self._ensure_docker_running()
+                if await asyncio.get_running_loop().run_in_executor(None, self._ensure_docker_running):
+                    # Wait for the just-started container to boot
+                    attempts = DOCKER_START_ATTEMPTS
                 
-            self.driver = GraphDatabase.driver(
-                NEO4J_URI, 
-                auth=(NEO4J_USER, NEO4J_PASSWORD)
-            )
+            self.driver = self._create_driver()
             # Test the connection
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            await verify_with_backoff(self.driver, attempts)
             self.connected = True
             logger.info("Successfully reconnected to Neo4j")
+            await self.ensure_schema()
             return True
         except Exception as e:
             logger.error(f"Failed to reconnect to Neo4j: {e}")
@@ -133,7 +407,26 @@ class Neo4jService:
             self.connected = False
             return False
     
-    def create_or_update_file_node(self, repo_path: str, file_path: str, file_type: str = "python") -> Optional[str]:
+    async def ensure_connected(self) -> bool:
+        """Reconnect if disconnected; concurrent callers share one attempt, and attempts back off."""
+        if self.connected:
+            return True
+        
+        async with self._reconnect_lock:
+            # Another caller may have reconnected, or just failed to, while this one waited
+            if self.connected:
+                return True
+            # Requests don't wait out the backoff; until it has passed they fail fast
+            if time.monotonic() < self._next_reconnect_at:
+                return False
+            if await self.reconnect():
+                self._reconnect_failures = 0
+                return True
+            self._next_reconnect_at = time.monotonic() + backoff_delay(self._reconnect_failures)
+            self._reconnect_failures += 1
+            return False
+    
+    async def create_or_update_file_node(self, repo_path: str, file_path: str, file_type: str = "python") -> Optional[str]:
         """Create or update a file node in the graph.
         
         Args:
@@ -146,33 +439,34 @@ class Neo4jService:
         """
         if not self.connected:
             logger.warning("Cannot create file node: Not connected to Neo4j")
-            if self.reconnect():
+            if await self.ensure_connected():
                 logger.info("Reconnected to Neo4j, retrying operation")
             else:
                 return None
             
         try:
-            with self.driver.session() as session:
-                result = session.run(
-                    """
-                    MERGE (f:File {path: $path, repo: $repo})
-                    SET f.type = $type,
-                        f.name = $name,
-                        f.last_updated = timestamp()
-                    RETURN elementId(f) as node_id
-                    """,
-                    path=file_path,
-                    repo=repo_path,
-                    type=file_type,
-                    name=os.path.basename(file_path)
-                )
-                record = result.single()
-                return record["node_id"] if record else None
+            # Single statements go through the driver's execute_query, which runs them
+            # on a pooled connection without setting up a session, in a managed
+            # transaction that the driver retries on transient errors
+            records, _, _ = await self.driver.execute_query(
+                FILE_NODE_QUERY,
+                parameters_={
+                    "path": file_path,
+                    "repo": repo_path,
+                    "type": file_type,
+                    "name": os.path.basename(file_path)
+                },
+                database_=self.database,
+                routing_=RoutingControl.WRITE
+            )
+            return records[0]["node_id"] if records else None
         except Exception as e:
             logger.error(f"Error creating file node: {e}")
             return None
+        finally:
+            self.invalidate_code_graph(repo_path)
     
-    def create_module_structure(self, file_id: str, classes: List[Dict], functions: List[Dict], imports: List[Dict]):
+    async def create_module_structure(self, file_id: str, classes: List[Dict], functions: List[Dict], imports: List[Dict]):
         """Create class, function, and import nodes and connect them to the file.
         
         Args:
@@ -185,65 +479,109 @@ class Neo4jService:
             logger.warning("Cannot create module structure: Not connected to Neo4j or invalid file_id")
             if not file_id:
                 return
-            if self.reconnect():
+            if await self.ensure_connected():
                 logger.info("Reconnected to Neo4j, retrying operation")
             else:
                 return
         
+        # One transaction and one query for all of the file's nodes, rather than
+        # a round-trip per class, function and import
         try:
-            with self.driver.session() as session:
-                # Create class nodes
-                for cls in classes:
-                    session.run(
-                        """
-                        MATCH (f:File)
-                        WHERE elementId(f) = $file_id
-                        MERGE (c:Class {name: $name, file_id: $file_id})
-                        SET c.line_start = $start,
-                            c.line_end = $end
-                        MERGE (f)-[:CONTAINS]->(c)
-                        """,
-                        file_id=file_id,
-                        name=cls["name"],
-                        start=cls["lineno"],
-                        end=cls["end_lineno"]
-                    )
-                
-                # Create function nodes
-                for func in functions:
-                    session.run(
-                        """
-                        MATCH (f:File)
-                        WHERE elementId(f) = $file_id
-                        MERGE (fn:Function {name: $name, file_id: $file_id})
-                        SET fn.line_start = $start,
-                            fn.line_end = $end
-                        MERGE (f)-[:CONTAINS]->(fn)
-                        """,
-                        file_id=file_id,
-                        name=func["name"],
-                        start=func["lineno"],
-                        end=func["end_lineno"]
-                    )
-                
-                # Create import nodes
-                for imp in imports:
-                    session.run(
-                        """
-                        MATCH (f:File)
-                        WHERE elementId(f) = $file_id
-                        MERGE (i:Import {name: $name, file_id: $file_id})
-                        SET i.line = $line
-                        MERGE (f)-[:IMPORTS]->(i)
-                        """,
-                        file_id=file_id,
-                        name=imp["name"],
-                        line=imp["lineno"]
-                    )
+            async with self.driver.session(database=self.database) as session:
+                await session.execute_write(self._tx_create_module_structure, file_id, classes, functions, imports)
         except Exception as e:
             logger.error(f"Error creating module structure: {e}")
+        finally:
+            # Only the file's id is known here, not its repository
+            self.invalidate_code_graph()
     
-    def get_code_graph(self, repo_path: str, depth: int = 2) -> Dict[str, Any]:
+    @staticmethod
+    async def _tx_create_module_structure(tx, file_id: str, classes: List[Dict], functions: List[Dict], imports: List[Dict]):
+        """Merge a file's class, function, and import nodes inside a transaction."""
+        result = await tx.run(
+            MODULE_STRUCTURE_QUERY,
+            {"file_id": file_id, "classes": classes, "functions": functions, "imports": imports}
+        )
+        await result.consume()
+    
+    async def upsert_files(self, repo_path: str, files: List[Dict[str, Any]]):
+        """Create or update file nodes and their class, function, and import nodes in one transaction.
+        
+        Args:
+            repo_path: Path to the repository
+            files: File info dictionaries, each with the file's path (relative to repo),
+                type, name and content hash, and its classes, functions and imports as
+                create_module_structure takes them
+        """
+        if not files:
+            return
+        
+        if not self.connected:
+            logger.warning("Cannot upsert files: Not connected to Neo4j")
+            if await self.ensure_connected():
+                logger.info("Reconnected to Neo4j, retrying operation")
+            else:
+                return
+        
+        try:
+            async with self.driver.session(database=self.database) as session:
+                await session.execute_write(self._tx_upsert_files, repo_path, files)
+        except Exception as e:
+            logger.error(f"Error upserting files: {e}")
+        finally:
+            self.invalidate_code_graph(repo_path)
+    
+    @asynccontextmanager
+    async def bulk(self):
+        """Hold one session across a run of writes, such as indexing a repository.
+        
+        Yields a BulkWriter; each of its batches is still its own managed transaction.
+        """
+        if not self.connected:
+            yield BulkWriter(self)
+            return
+        
+        async with self.driver.session(database=self.database) as session:
+            yield BulkWriter(self, session)
+    
+    async def get_file_hashes(self, repo_path: str) -> Dict[str, str]:
+        """Get the content hashes upsert_files stored for a repository's files.
+        
+        Args:
+            repo_path: Path to the repository
+            
+        Returns:
+            Dictionary mapping each file's path (relative to repo) to its hash
+        """
+        if not self.connected:
+            logger.warning("Cannot get file hashes: Not connected to Neo4j")
+            if await self.ensure_connected():
+                logger.info("Reconnected to Neo4j, retrying operation")
+            else:
+                return {}
+        
+        try:
+            records, _, _ = await self.driver.execute_query(
+                FILE_HASHES_QUERY,
+                parameters_={"repo": repo_path},
+                database_=self.database,
+                routing_=RoutingControl.READ
+            )
+            return {record["path"]: record["hash"] for record in records if record["hash"] is not None}
+        except Exception as e:
+            logger.error(f"Error getting file hashes: {e}")
+            return {}
+    
+    @staticmethod
+    async def _tx_upsert_files(tx, repo_path: str, files: List[Dict[str, Any]]):
+        """Merge file nodes and their structure nodes inside a transaction."""
+        result = await tx.run(
+            UPSERT_FILES_QUERY,
+            {"repo": repo_path, "files": files}
+        )
+        await result.consume()
+    
+    async def get_code_graph(self, repo_path: str, depth: int = 2) -> Dict[str, Any]:
         """Get the code graph for visualization.
         
         Args:
@@ -253,83 +591,153 @@ class Neo4jService:
         Returns:
             Dictionary with nodes and relationships for visualization
         """
+        record = await self._fetch_code_graph(repo_path)
+        if record is None:
+            return {"nodes": [], "links": []}
+        
+        return {
+            "nodes": list(self._iter_graph_nodes(record)),
+            "links": list(self._iter_graph_links(record))
+        }
+    
+    async def stream_code_graph(self, repo_path: str) -> Iterator[bytes]:
+        """Get the code graph get_code_graph returns as JSON chunks, for a streamed response.
+        
+        Nodes and links are encoded a chunk at a time instead of first being
+        collected into the dictionary get_code_graph builds.
+        """
+        record = await self._fetch_code_graph(repo_path)
+        return self._iter_graph_json(record)
+    
+    async def _fetch_code_graph(self, repo_path: str):
+        """Get a repository's nodes and links, cached between writes; None if there are none or the query failed."""
+        # The key is taken before querying, so a write landing mid-query leaves the
+        # result under a key that is already stale
+        key = (repo_path, self._repo_versions[repo_path], self._graph_generation)
+        cached = self._graph_cache.get(key)
+        if cached is not None:
+            fetched_at, record = cached
+            if time.monotonic() - fetched_at < GRAPH_CACHE_TTL:
+                self._graph_cache.move_to_end(key)
+                return record
+            del self._graph_cache[key]
+        
+        record = await self._query_code_graph(repo_path)
+        if record is not None:
+            self._graph_cache[key] = (time.monotonic(), record)
+            if len(self._graph_cache) > GRAPH_CACHE_SIZE:
+                self._graph_cache.popitem(last=False)
+        return record
+    
+    async def _query_code_graph(self, repo_path: str):
+        """Query a repository's nodes and links; None if there are none or the query failed."""
         if not self.connected:
             logger.warning("Cannot get code graph: Not connected to Neo4j")
-            if self.reconnect():
+            if await self.ensure_connected():
                 logger.info("Reconnected to Neo4j, retrying operation")
             else:
-                return {"nodes": [], "links": []}
+                return None
         
         try:
-            with self.driver.session() as session:
-                # Get file IDs for the repository
-                file_ids_result = session.run(
-                    """
-                    MATCH (f:File)
-                    WHERE f.repo = $repo
-                    RETURN elementId(f) as id
-                    """,
-                    repo=repo_path
-                )
-                
-                file_ids = [record["id"] for record in file_ids_result]
-                
-                if not file_ids:
-                    logger.warning(f"No files found for repository: {repo_path}")
-                    return {"nodes": [], "links": []}
-                
-                # Get all nodes
-                node_result = session.run(
-                    """
-                    MATCH (n)
-                    WHERE n.repo = $repo OR n.file_id IN $file_ids
-                    RETURN elementId(n) as id, labels(n) as labels, properties(n) as props
-                    """,
-                    repo=repo_path,
-                    file_ids=file_ids
-                )
-                
-                # Get all relationships
-                rel_result = session.run(
-                    """
-                    MATCH (n)-[r]->(m)
-                    WHERE n.repo = $repo OR m.repo = $repo OR
-                          n.file_id IN $file_ids OR m.file_id IN $file_ids
-                    RETURN elementId(n) as source, elementId(m) as target, type(r) as type
-                    """,
-                    repo=repo_path,
-                    file_ids=file_ids
-                )
-                
-                # Process nodes
-                nodes = []
-                for record in node_result:
-                    node_type = record["labels"][0] if record["labels"] else "Unknown"
-                    nodes.append({
-                        "id": str(record["id"]),
-                        "label": record["props"].get("name", ""),
-                        "type": node_type,
-                        "properties": record["props"]
-                    })
-                
-                # Process relationships
-                links = []
-                for record in rel_result:
-                    links.append({
-                        "source": str(record["source"]),
-                        "target": str(record["target"]),
-                        "type": record["type"]
-                    })
-                
-                return {
-                    "nodes": nodes,
-                    "links": links
-                }
+            # One round-trip for the repository's nodes and links
+            records, _, _ = await self.driver.execute_query(
+                CODE_GRAPH_QUERY,
+                parameters_={"repo": repo_path},
+                database_=self.database,
+                routing_=RoutingControl.READ
+            )
         except Exception as e:
             logger.error(f"Error getting code graph: {e}")
-            return {"nodes": [], "links": []}
+            return None
+        
+        record = records[0] if records else None
+        if not record or not record["nodes"]:
+            logger.warning(f"No files found for repository: {repo_path}")
+            return None
+        return record
     
-    def execute_query(self, query: str, params: Dict = None) -> Dict[str, Any]:
+    @staticmethod
+    def _iter_graph_nodes(record) -> Iterator[Dict[str, Any]]:
+        """Convert a graph record's nodes for visualization; a file another file points at is listed once."""
+        seen_ids = set()
+        for node in record["nodes"]:
+            if node["id"] in seen_ids:
+                continue
+            seen_ids.add(node["id"])
+            node_type = node["labels"][0] if node["labels"] else "Unknown"
+            yield {
+                "id": str(node["id"]),
+                "label": node["props"].get("name", ""),
+                "type": node_type,
+                "properties": node["props"]
+            }
+    
+    @staticmethod
+    def _iter_graph_links(record) -> Iterator[Dict[str, Any]]:
+        """Convert a graph record's relationships for visualization."""
+        for link in record["links"]:
+            yield {
+                "source": str(link["source"]),
+                "target": str(link["target"]),
+                "type": link["type"]
+            }
+    
+    @classmethod
+    def _iter_graph_json(cls, record) -> Iterator[bytes]:
+        """Encode a graph record as the JSON of get_code_graph's result."""
+        if record is None:
+            yield b'{"nodes":[],"links":[]}'
+            return
+        
+        yield b'{"nodes":['
+        yield from _iter_json_items(cls._iter_graph_nodes(record))
+        yield b'],"links":['
+        yield from _iter_json_items(cls._iter_graph_links(record))
+        yield b']}'
+    
+    async def get_graph_counts(self, repo_paths: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Count the nodes and links of several repositories' code graphs in one query.
+        
+        Counts cover the same nodes and links get_code_graph returns, without
+        transferring the graphs themselves.
+        
+        Args:
+            repo_paths: Paths of the repositories
+            
+        Returns:
+            Dictionary mapping each repository path to its (node count, link count)
+        """
+        if not repo_paths:
+            return {}
+        
+        if not self.connected:
+            logger.warning("Cannot get graph counts: Not connected to Neo4j")
+            if await self.ensure_connected():
+                logger.info("Reconnected to Neo4j, retrying operation")
+            else:
+                return {}
+        
+        try:
+            # One managed read transaction: routed to a reader and retried on transient errors
+            async with self.driver.session(database=self.database) as session:
+                return await session.execute_read(self._tx_graph_counts, repo_paths)
+        except Exception as e:
+            logger.error(f"Error getting graph counts: {e}")
+            return {}
+    
+    @staticmethod
+    async def _tx_graph_counts(tx, repo_paths: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Count nodes and links per repository inside a transaction."""
+        result = await tx.run(
+            GRAPH_COUNTS_QUERY,
+            {"repos": repo_paths}
+        )
+        return {
+            record["repo"]: (record["node_count"], record["link_count"])
+            async for record in result
+        }
+    
+    async def execute_query(self, query: str, params: Dict = None) -> Dict[str, Any]:
         """Execute a custom Cypher query against the Neo4j database.
         
         Args:
@@ -341,28 +749,45 @@ class Neo4jService:
         """
         if not self.connected:
             logger.warning("Cannot execute query: Not connected to Neo4j")
-            if self.reconnect():
+            if await self.ensure_connected():
                 logger.info("Reconnected to Neo4j, retrying operation")
             else:
                 return {"error": "Not connected to Neo4j"}
                 
+        # Custom queries keep an auto-commit session: they may use clauses such as
+        # CALL { ... } IN TRANSACTIONS that can't run in a managed transaction
         try:
-            with self.driver.session() as session:
-                result = session.run(query, params or {})
-                records = [dict(record) for record in result]
+            async with self.driver.session(database=self.database) as session:
+                result = await session.run(query, params or {})
+                records = [dict(record) async for record in result]
+                result_summary = await result.consume()
                 summary = {
-                    "counters": dict(result.consume().counters),
-                    "query_time": result.consume().result_available_after
+                    "counters": dict(result_summary.counters),
+                    "query_time": result_summary.result_available_after
                 }
                 return {"records": records, "summary": summary}
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             return {"error": str(e)}
+        finally:
+            # Custom queries may write to any repository's graph
+            self.invalidate_code_graph()
+
+# Shared instance, created on first use rather than on import: connecting can start
+# Docker and wait for Neo4j, which importers that never query it shouldn't pay for
+_neo4j_service: Optional[Neo4jService] = None
+_neo4j_service_lock: Optional[asyncio.Lock] = None
 
-# Singleton instance
-try:
-    neo4j_service = Neo4jService()
-except Exception as e:
-    logger.error(f"Failed to create Neo4j service: {e}")
-    # Create a non-functional service as a fallback
-    neo4j_service = Neo4jService(auto_start_docker=False) 
\ No newline at end of file
+async def get_neo4j_service() -> Neo4jService:
+    """Get the shared Neo4j service, connecting on the first call."""
+    global _neo4j_service, _neo4j_service_lock
+    if _neo4j_service is None:
+        # Created here rather than on import, so it belongs to the running loop
+        if _neo4j_service_lock is None:
+            _neo4j_service_lock = asyncio.Lock()
+        async with _neo4j_service_lock:
+            if _neo4j_service is None:
+                service = Neo4jService()
+                await service.connect()
+                _neo4j_service = service
+    return _neo4j_service 
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""The process pool that source files are parsed in, shared by the API and the indexer."""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Parsing is CPU-bound and holds the GIL, so files are parsed in worker processes.
+# Spawned rather than forked, so workers don't inherit the server's threads
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Get the parse pool, creating it on first use."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+def shutdown_parse_pool():
+    """Stop the parse pool's worker processes, if it was created."""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown()
+        _parse_pool = None
@@ -9,9 +9,18 @@ setup(
         "uvicorn>=0.24.0",
         "python-dotenv>=1.0.0",
         "neo4j>=5.14.0",
+        "docker>=6.1.0",
         "aiofiles>=23.2.1",
         "pydantic>=2.4.2",
         "python-multipart>=0.0.6",
+        "orjson>=3.9.0",
+        "tree-sitter>=0.22.0",
+        "tree-sitter-python>=0.21.0",
+        "tree-sitter-javascript>=0.21.0",
+        "tree-sitter-typescript>=0.21.0",
+        "xxhash>=3.0.0",
+        "zstandard>=0.21.0",
+        "apscheduler>=3.10.0,<4.0",
     ],
     extras_require={
         "dev": [
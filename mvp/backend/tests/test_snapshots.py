@@ -0,0 +1,68 @@
+import os
+import orjson
+import pytest
+
+from app.api import snapshots
+
+GRAPH = {"nodes": [{"id": "1", "label": "main.py"}], "links": []}
+
+@pytest.fixture
+def snapshot_dirs(tmp_path, monkeypatch):
+    """Point snapshot and graph blob storage at a temporary directory"""
+    snapshots_dir = tmp_path / "snapshots"
+    snapshots_dir.mkdir()
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_DIR", str(snapshots_dir))
+    monkeypatch.setattr(snapshots, "GRAPH_BLOBS_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(snapshots, "_graph_refs", None)
+    monkeypatch.setattr(snapshots, "_snapshot_index", {})
+    monkeypatch.setattr(snapshots, "_snapshots_cache", {})
+    return tmp_path
+
+def save(snapshot_id, graph_data=GRAPH):
+    snapshots.save_snapshot("/repo", {"id": snapshot_id, "timestamp": snapshot_id, "graph_data": graph_data})
+
+def delete(snapshot_id):
+    snapshots.delete_snapshot_files(snapshot_id, snapshots.find_snapshot_path(snapshot_id))
+
+def blobs(snapshot_dirs):
+    blobs_dir = snapshot_dirs / "blobs"
+    return sorted(os.listdir(blobs_dir)) if blobs_dir.exists() else []
+
+def test_shared_blob_removed_with_last_snapshot(snapshot_dirs):
+    """Test that snapshots of the same graph share a blob that outlives all but the last of them"""
+    save("a")
+    save("b")
+    assert len(blobs(snapshot_dirs)) == 1
+
+    delete("a")
+    assert len(blobs(snapshot_dirs)) == 1
+    assert snapshots.get_snapshot("b")["graph_data"] == GRAPH
+
+    delete("b")
+    assert blobs(snapshot_dirs) == []
+
+def test_refs_rebuilt_from_disk(snapshot_dirs, monkeypatch):
+    """Test that references are rebuilt from the snapshots on disk, e.g. after a restart"""
+    save("a")
+    save("b")
+    monkeypatch.setattr(snapshots, "_graph_refs", None)
+
+    delete("a")
+    assert len(blobs(snapshot_dirs)) == 1
+
+    # Rebuilt again after "a" is gone, so only "b" refers to the blob
+    monkeypatch.setattr(snapshots, "_graph_refs", None)
+    delete("b")
+    assert blobs(snapshot_dirs) == []
+
+def test_legacy_snapshot_keeps_blobs(snapshot_dirs):
+    """Test that deleting a legacy snapshot with inline graph data leaves graph blobs alone"""
+    save("a")
+    legacy_path = os.path.join(snapshots.get_repo_snapshots_dir("/repo"), "legacy.json")
+    with open(legacy_path, "wb") as f:
+        f.write(orjson.dumps({"id": "legacy", "timestamp": "legacy", "graph_data": GRAPH}))
+
+    delete("legacy")
+    assert not os.path.exists(legacy_path)
+    assert len(blobs(snapshot_dirs)) == 1
+    assert snapshots.get_snapshot("a")["graph_data"] == GRAPH
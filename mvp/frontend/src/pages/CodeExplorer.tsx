@@ -126,8 +126,8 @@ export function CodeExplorer() {
       
       if (!response.ok) throw new Error('Failed to fetch file content');
       
-      const data = await response.json();
-      setFileContent(data.content);
+      // The file is served as plain text rather than wrapped in JSON
+      setFileContent(await response.text());
     } catch (err) {
       console.error('Error loading file:', err);
       setError(err instanceof Error ? err.message : 'Failed to load file content');
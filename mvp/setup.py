@@ -1,19 +1,37 @@
+import os
 from setuptools import setup, find_packages
 
+# Optionally compile the Python AST walker and node models with mypyc
+# (MYPYC_COMPILE=1 pip install ., requires mypy)
+ext_modules = []
+if os.getenv("MYPYC_COMPILE") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify([
+        "--explicit-package-bases",
+        "app/indexer/parser.py",
+        "app/database/models.py",
+    ])
+
 setup(
     name="mcp_code_indexer",
     version="0.1.0",
     packages=find_packages(),
+    ext_modules=ext_modules,
     install_requires=[
         "fastapi>=0.68.0",
         "uvicorn>=0.15.0",
         "python-dotenv>=0.19.0",
-        "neo4j>=4.4.0",
+        "neo4j>=5.0.0",
         "pydantic>=1.8.0",
         "astroid>=2.8.0",  # For Python parsing
-        "esprima>=4.0.0",  # For JavaScript/TypeScript parsing
+        "tree-sitter>=0.22.0",  # For JavaScript/TypeScript parsing
+        "tree-sitter-javascript>=0.21.0",
+        "tree-sitter-typescript>=0.21.0",
         "pytest>=6.2.0",
         "requests>=2.26.0",
+        "xxhash>=3.0.0",  # For file change detection
+        "diskcache>=5.0.0",  # For caching parsed ASTs
+        "pathspec>=0.10.0",  # For .gitignore matching
     ],
     extras_require={
         "dev": [
@@ -22,7 +40,7 @@ setup(
             "pytest-cov",
         ]
     },
-    python_requires=">=3.8",
+    python_requires=">=3.10",
     author="Your Organization",
     author_email="your.email@example.com",
     description="A tool for indexing and analyzing code structure using Neo4j",
@@ -33,8 +51,6 @@ setup(
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
     ],
 ) 
\ No newline at end of file
@@ -31,15 +31,20 @@ import os
             
         yield temp_dir
 
-@pytest.fixture
-def indexer(temp_repo):
-    """Create an indexer instance connected to Neo4j"""
+@pytest.fixture(scope="module")
+def client():
+    """Connect to Neo4j once for all of the module's tests"""
     client = Neo4jClient()
     client.connect()
+    yield client
+    client.close()
+
+@pytest.fixture
+def indexer(client, temp_repo):
+    """Create an indexer instance, clearing what it indexed after the test"""
     indexer = CodeIndexer()
     yield indexer
     client.clear_database()
-    client.close()
 
 def test_index_repository(indexer, temp_repo):
     """Test basic repository indexing"""
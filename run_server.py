@@ -4,5 +4,16 @@ import os
 if __name__ == "__main__":
     print(f"Current working directory: {os.getcwd()}")
     print("Starting Uvicorn server...")
+    # Development runs (MCP_DEV=1) reload on code changes in a single worker; otherwise
+    # the file watcher is off and requests are spread over one worker per core. Workers
+    # share the SQLite index, which migrates its schema inside a write transaction
+    dev = os.getenv("MCP_DEV") == "1"
     # The app string assumes 'mcp_server' is a package in the cwd
-    uvicorn.run("mcp_server.main:app", host="127.0.0.1", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run(
+        "mcp_server.main:app",
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "8000")),
+        reload=dev,
+        workers=1 if dev else max(2, os.cpu_count() or 2),
+        log_level="info"
+    )
\ No newline at end of file